@@ -1,9 +1,10 @@
 import os
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, decode_token
 from database import get_database
-from flask_socketio import SocketIO
+from database.indexes import ensure_indexes
+from flask_socketio import SocketIO, emit, join_room, leave_room
 
 # Import blueprints
 from routes.auth_routes import auth_bp, jwt
@@ -13,16 +14,27 @@ from routes.stock_routes import stock_bp
 from routes.analysis_routes import analysis_bp
 from routes.portfolio_routes import portfolio_bp
 from routes.profile_routes import profile_bp
+from background_jobs.stock_monitor import start_stock_monitor
+from background_jobs.reconcile_jobs import start_reconcile_jobs
+from services import price_feed
+from services.alert_service import init_alert_service, user_room
+from services.stock_service import get_multiple_stocks
+from utils.json_provider import MongoJSONProvider
 
 socketio = SocketIO(cors_allowed_origins="*")
+# Ack for subscribe/unsubscribe payloads that aren't {"symbols": [...]}
+SUBSCRIPTION_PAYLOAD_ERROR = {"error": "Payload must be an object with a 'symbols' list"}
+
 def create_app():
     app = Flask(__name__)
+    app.json = MongoJSONProvider(app)
     
     # Configuration - Use environment variables for production
     app.config['DEBUG'] = os.environ.get('DEBUG', 'False').lower() == 'true'
     app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'fallback-secret-key-change-in-production')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False
     socketio.init_app(app)
+    init_alert_service(socketio)
     # Get frontend URL from environment or use default
     frontend_url = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
     
@@ -40,12 +52,12 @@ def create_app():
     # Initialize JWT
     jwt.init_app(app)
     
-    # Initialize database connection
-    try:
-        get_database()
-        print("✅ Database initialized successfully!")
-    except Exception as e:
-        print(f"❌ Database initialization failed: {e}")
+    # Initialize database connection. An unreachable database and a missing
+    # unique index both stop startup: every write path needs the database, and
+    # several rely on those indexes to stay correct
+    get_database()
+    ensure_indexes()
+    print("✅ Database initialized successfully!")
     
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -56,6 +68,12 @@ def create_app():
     app.register_blueprint(portfolio_bp, url_prefix='/api')
     app.register_blueprint(profile_bp, url_prefix='/api')
     
+    # Background jobs (skip the reloader's parent process in debug mode)
+    if not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_stock_monitor()
+        start_reconcile_jobs()
+        price_feed.start_price_feed(socketio)
+    
     # Health check route - Important for deployment
     @app.route('/health', methods=['GET'])
     def health_check():
@@ -92,13 +110,47 @@ def create_app():
         return jsonify({"error": "Internal server error"}), 500
     
     @socketio.on('connect')
-    def handle_connect():
+    def handle_connect(auth=None):
+        # Like the HTTP quote routes, the socket needs a valid JWT; the client
+        # joins its own room to receive price alerts
+        token = (auth or {}).get('token') if isinstance(auth, dict) else None
+        try:
+            identity = decode_token(token)['sub'] if token else None
+        except Exception as e:
+            print(f"Socket auth failed: {e}")
+            identity = None
+        if identity is None:
+            return False
+        join_room(user_room(identity))
         print('Client connected')
     
     @socketio.on('disconnect') 
     def handle_disconnect():
+        for symbol in price_feed.unsubscribe(request.sid):
+            leave_room(price_feed.room_for(symbol))
         print('Client disconnected')
     
+    @socketio.on('subscribe')
+    def handle_subscribe(data):
+        if not isinstance(data, dict):
+            return SUBSCRIPTION_PAYLOAD_ERROR
+        symbols = price_feed.subscribe(request.sid, data.get('symbols'))
+        for symbol in symbols:
+            join_room(price_feed.room_for(symbol))
+        # Send the current quotes straight away; the feed only pushes changes
+        for quote in get_multiple_stocks(symbols):
+            emit('price_update', quote)
+        return {"subscribed": symbols, "limit": price_feed.PRICE_FEED_MAX_SYMBOLS}
+    
+    @socketio.on('unsubscribe')
+    def handle_unsubscribe(data):
+        if not isinstance(data, dict):
+            return SUBSCRIPTION_PAYLOAD_ERROR
+        symbols = price_feed.unsubscribe(request.sid, data.get('symbols'))
+        for symbol in symbols:
+            leave_room(price_feed.room_for(symbol))
+        return {"unsubscribed": symbols}
+    
     return app
 
 # For local development
@@ -0,0 +1,66 @@
+import os
+from background_jobs.scheduler import schedule_interval_job, remove_job
+from services.notification_service import reconcile_unread_counters, touched_counters
+from services.portfolio_aggregates import reconcile_portfolio_aggregates, touched_portfolios
+
+# Unread counters and portfolio aggregates are maintained incrementally next
+# to the writes they summarize; these jobs correct any drift (a failed counter
+# or aggregate write, a partial bulk insert, a race with a backfill).
+#
+# The frequent pass only checks users touched since its last run in this
+# process (the app runs one worker), through indexed per-user queries. What a
+# crashed process never got to record is caught by the full sweep, which
+# checks every counter and aggregate in batches; its cost grows with the
+# number of users, so it runs rarely. An interval of 0 disables that pass.
+RECONCILE_JOBS_ENABLED = os.environ.get('RECONCILE_JOBS_ENABLED', 'true').lower() == 'true'
+RECONCILE_INTERVAL = int(os.environ.get('RECONCILE_INTERVAL', '900'))  # seconds
+FULL_RECONCILE_INTERVAL = int(os.environ.get('FULL_RECONCILE_INTERVAL', str(24 * 60 * 60)))  # seconds
+
+JOB_IDS = ('reconcile_touched', 'reconcile_all')
+_started = False
+
+def _reconcile(label, fn, user_ids=None):
+    try:
+        summary = fn(user_ids)
+        print(f"🔄 {label} reconciled: {summary['corrected']} of {summary['users_checked']} users corrected "
+              f"in {summary['duration_ms']} ms")
+        return summary
+    except Exception as e:
+        print(f"❌ {label} reconciliation failed: {e}")
+
+def run_reconcile_touched():
+    """Check the users written to since the last run"""
+    return {
+        "unread_counters": _reconcile("Unread counters", reconcile_unread_counters, touched_counters.drain()),
+        "portfolio_aggregates": _reconcile("Portfolio aggregates", reconcile_portfolio_aggregates,
+                                           touched_portfolios.drain())
+    }
+
+def run_reconcile_all():
+    """Check every stored counter and aggregate"""
+    return {
+        "unread_counters": _reconcile("Unread counters", reconcile_unread_counters),
+        "portfolio_aggregates": _reconcile("Portfolio aggregates", reconcile_portfolio_aggregates)
+    }
+
+def start_reconcile_jobs():
+    """Register the reconciliation passes on the shared scheduler once per process"""
+    global _started
+    if _started or not RECONCILE_JOBS_ENABLED:
+        return
+    if RECONCILE_INTERVAL > 0:
+        schedule_interval_job(run_reconcile_touched, RECONCILE_INTERVAL, 'reconcile_touched')
+    if FULL_RECONCILE_INTERVAL > 0:
+        schedule_interval_job(run_reconcile_all, FULL_RECONCILE_INTERVAL, 'reconcile_all')
+    _started = True
+    print(f"✅ Reconcile jobs started (touched users every {RECONCILE_INTERVAL}s, "
+          f"full sweep every {FULL_RECONCILE_INTERVAL}s)")
+
+def stop_reconcile_jobs():
+    global _started
+    for job_id in JOB_IDS:
+        remove_job(job_id)
+    _started = False
+
+if __name__ == '__main__':
+    print(run_reconcile_all())
@@ -0,0 +1,38 @@
+import threading
+from apscheduler.schedulers.background import BackgroundScheduler
+
+# The process-wide scheduler. Every periodic job (quote refresh, counter and
+# aggregate reconciliation) is registered here, so they share one APScheduler
+# thread pool instead of each module starting its own.
+_scheduler = None
+_lock = threading.Lock()
+
+def schedule_interval_job(fn, seconds, job_id, **kwargs):
+    """Add an interval job (replacing one with the same id), starting the scheduler on first use"""
+    global _scheduler
+    with _lock:
+        if _scheduler is None:
+            _scheduler = BackgroundScheduler(daemon=True)
+            _scheduler.start()
+        return _scheduler.add_job(
+            fn,
+            'interval',
+            seconds=seconds,
+            id=job_id,
+            max_instances=1,
+            coalesce=True,
+            replace_existing=True,
+            **kwargs
+        )
+
+def remove_job(job_id):
+    with _lock:
+        if _scheduler is not None and _scheduler.get_job(job_id) is not None:
+            _scheduler.remove_job(job_id)
+
+def shutdown_scheduler():
+    global _scheduler
+    with _lock:
+        if _scheduler is not None:
+            _scheduler.shutdown(wait=False)
+            _scheduler = None
@@ -0,0 +1,77 @@
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from background_jobs.scheduler import schedule_interval_job, remove_job
+from database import get_database
+from services.stock_service import fetch_quotes_batch
+from services.alert_service import check_prices
+
+# Keeps the shared quote cache warm for every symbol users actually follow, so
+# dashboard, watchlist and portfolio requests rarely have to go upstream.
+STOCK_MONITOR_ENABLED = os.environ.get('STOCK_MONITOR_ENABLED', 'true').lower() == 'true'
+STOCK_MONITOR_INTERVAL = int(os.environ.get('STOCK_MONITOR_INTERVAL', '60'))  # seconds
+STOCK_MONITOR_BATCH_SIZE = int(os.environ.get('STOCK_MONITOR_BATCH_SIZE', '50'))  # symbols per bulk download
+STOCK_MONITOR_MAX_BATCHES = int(os.environ.get('STOCK_MONITOR_MAX_BATCHES', '2'))  # batches in flight at once
+
+_job = None
+
+def get_tracked_symbols():
+    """Distinct symbols across all users' watchlists, portfolios and active price alerts"""
+    db = get_database()
+    symbols = (set(db.watchlist.distinct("stocks.symbol")) | set(db.portfolio.distinct("symbol"))
+               | set(db.alerts.distinct("symbol", {"active": True})))
+    return sorted({symbol.upper() for symbol in symbols if isinstance(symbol, str) and symbol})
+
+def refresh_tracked_symbols():
+    """Refresh quotes for every tracked symbol into the quote cache and
+    evaluate price alerts against them.
+
+    Runs on the scheduler, but can also be called directly (e.g. from tests or
+    `python -m background_jobs.stock_monitor`). Returns a short summary.
+    """
+    started = time.monotonic()
+    symbols = get_tracked_symbols()
+    batches = [symbols[i:i + STOCK_MONITOR_BATCH_SIZE] for i in range(0, len(symbols), STOCK_MONITOR_BATCH_SIZE)]
+
+    refreshed = 0
+    triggered = 0
+    if batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(STOCK_MONITOR_MAX_BATCHES, len(batches)))) as executor:
+            for quotes in executor.map(fetch_quotes_batch, batches):
+                refreshed += len(quotes)
+                triggered += len(check_prices(quotes.values()))
+
+    summary = {
+        "symbols": len(symbols),
+        "batches": len(batches),
+        "refreshed": refreshed,
+        "alerts_triggered": triggered,
+        "duration_ms": round((time.monotonic() - started) * 1000, 1)
+    }
+    print(f"🔄 Stock monitor refreshed {refreshed}/{len(symbols)} symbols in {summary['duration_ms']} ms")
+    return summary
+
+def start_stock_monitor():
+    """Start the background refresher once per process"""
+    global _job
+    if _job is not None or not STOCK_MONITOR_ENABLED:
+        return _job
+
+    _job = schedule_interval_job(
+        refresh_tracked_symbols,
+        STOCK_MONITOR_INTERVAL,
+        'refresh_tracked_symbols',
+        next_run_time=datetime.now()
+    )
+    print(f"✅ Stock monitor started (every {STOCK_MONITOR_INTERVAL}s)")
+    return _job
+
+def stop_stock_monitor():
+    global _job
+    if _job is not None:
+        remove_job('refresh_tracked_symbols')
+        _job = None
+
+if __name__ == '__main__':
+    print(refresh_tracked_symbols())
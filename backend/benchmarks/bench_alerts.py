@@ -0,0 +1,103 @@
+import time
+import numpy as np
+from benchmarks.harness import best_of, print_table, ms, Checks, in_memory_database
+
+# AlertIndex.pop_triggered against a linear scan over the active alerts, the
+# way an engine without the per-symbol sorted index would evaluate a tick.
+# Ticks follow a small random walk around each symbol's base price, so most
+# of them fire nothing and a few fire a handful of alerts.
+#
+#   python -m benchmarks.bench_alerts
+
+ALERTS = 100_000
+SYMBOLS = 500
+TICKS = 1_000
+
+def make_alerts(rng):
+    symbols = [f"SYM{i:03d}" for i in range(SYMBOLS)]
+    base = dict(zip(symbols, rng.uniform(10, 500, SYMBOLS)))
+    alerts = []
+    for i in range(ALERTS):
+        symbol = symbols[i % SYMBOLS]
+        condition = "above" if rng.random() < 0.5 else "below"
+        # Above-targets sit over the base price and below-targets under it, so nothing fires on load
+        spread = rng.uniform(0.005, 0.5)
+        target = base[symbol] * (1 + spread if condition == "above" else 1 - spread)
+        alerts.append({"_id": i, "user_id": i % 1000, "symbol": symbol, "condition": condition,
+                       "target_price": round(target, 2)})
+    return base, alerts
+
+def make_ticks(rng, base):
+    symbols = list(base)
+    prices = dict(base)
+    ticks = []
+    for _ in range(TICKS):
+        symbol = symbols[rng.integers(len(symbols))]
+        prices[symbol] *= 1 + rng.normal(0, 0.01)
+        ticks.append((symbol, prices[symbol]))
+    return ticks
+
+class LinearScan:
+    """Every tick checks every active alert"""
+
+    def __init__(self, alerts):
+        self.active = list(alerts)
+
+    def pop_triggered(self, symbol, price):
+        fired, remaining = [], []
+        for alert in self.active:
+            crossed = alert["symbol"] == symbol and (
+                price >= alert["target_price"] if alert["condition"] == "above" else price <= alert["target_price"])
+            (fired if crossed else remaining).append(alert)
+        self.active = remaining
+        return fired
+
+def run_ticks(engine, ticks):
+    return [sorted(alert["_id"] for alert in engine.pop_triggered(symbol, price)) for symbol, price in ticks]
+
+def main():
+    in_memory_database()
+    from services.alert_service import AlertIndex
+
+    rng = np.random.default_rng(0)
+    base, alerts = make_alerts(rng)
+    ticks = make_ticks(rng, base)
+    checks = Checks()
+
+    def loaded_index():
+        index = AlertIndex()
+        index.load(alerts)
+        return index
+
+    load_ms = best_of(loaded_index, repeat=3)
+
+    index_fired = run_ticks(loaded_index(), ticks)
+    linear_fired = run_ticks(LinearScan(alerts), ticks)
+    checks.expect(index_fired == linear_fired, f"index and linear scan fire the same alerts on {TICKS} ticks")
+    fired = sum(map(len, index_fired))
+    print(f"   {fired} alerts fired, {sum(1 for ids in index_fired if ids)} of {TICKS} ticks fired any")
+
+    # Timed on fresh copies so every run sees the same alerts and fires the same ones
+    index_ms = _time_ticks(loaded_index, ticks, repeat=5)
+    linear_ms = _time_ticks(lambda: LinearScan(alerts), ticks, repeat=1)
+
+    print_table(f"{ALERTS:,} active alerts over {SYMBOLS} symbols", ["", "ms"], [
+        ["AlertIndex.load", ms(load_ms)],
+        ["per tick, AlertIndex", f"{index_ms:.5f}"],
+        ["per tick, linear scan", ms(linear_ms)],
+    ])
+    print(f"   index is {linear_ms / index_ms:.0f}x faster per tick")
+    checks.finish()
+
+def _time_ticks(make_engine, ticks, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        engine = make_engine()
+        start = time.perf_counter()
+        for symbol, price in ticks:
+            engine.pop_triggered(symbol, price)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / len(ticks)
+
+if __name__ == '__main__':
+    main()
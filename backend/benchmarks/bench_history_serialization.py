@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from benchmarks.harness import best_of, print_table, ms, Checks
+from services.stock_service import history_columns, history_records
+
+# get_stock_history's serialization step on synthetic daily series shaped
+# like Ticker.history(): the original iterrows() loop, which recomputed a
+# rolling mean per row, against history_columns() + history_records().
+#
+#   python -m benchmarks.bench_history_serialization
+
+SIZES = (250, 1260, 10000)
+SLOW_LEGACY_BARS = 10000  # the loop is quadratic: time it once from this size on
+
+def ohlcv_frame(bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+    open_ = close * (1 + rng.normal(0, 0.003, bars))
+    index = pd.bdate_range(end="2024-06-28", periods=bars, tz="America/New_York", name="Date")
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * 1.01,
+        "Low": np.minimum(open_, close) * 0.99,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, bars).astype(float),
+    }, index=index)
+
+def legacy_records(hist):
+    """The serialization loop get_stock_history ran before it was vectorized"""
+    hist = hist.reset_index()
+    history_data = []
+    for index, row in hist.iterrows():
+        sma_20 = hist['Close'].rolling(window=min(20, index+1)).mean().iloc[index] if index >= 19 else 0
+        sma_50 = hist['Close'].rolling(window=min(50, index+1)).mean().iloc[index] if index >= 49 else 0
+
+        history_data.append({
+            "date": row['Date'].strftime('%Y-%m-%d'),
+            "timestamp": row['Date'].timestamp(),
+            "open": round(row['Open'], 2) if pd.notna(row['Open']) else 0,
+            "high": round(row['High'], 2) if pd.notna(row['High']) else 0,
+            "low": round(row['Low'], 2) if pd.notna(row['Low']) else 0,
+            "close": round(row['Close'], 2) if pd.notna(row['Close']) else 0,
+            "volume": int(row['Volume']) if pd.notna(row['Volume']) else 0,
+            "sma_20": round(sma_20, 2) if sma_20 else 0,
+            "sma_50": round(sma_50, 2) if sma_50 else 0
+        })
+    return history_data
+
+def vectorized_records(hist):
+    return history_records(history_columns(hist))
+
+def main():
+    checks = Checks()
+    rows = []
+    for bars in SIZES:
+        hist = ohlcv_frame(bars)
+        records = vectorized_records(hist)
+        checks.expect(records == legacy_records(hist), f"{bars} bars: output identical to the legacy loop")
+
+        legacy_ms = best_of(lambda: legacy_records(hist), repeat=1 if bars >= SLOW_LEGACY_BARS else 3)
+        vectorized_ms = best_of(lambda: vectorized_records(hist), repeat=7)
+        rows.append([bars, ms(legacy_ms), ms(vectorized_ms), f"{legacy_ms / vectorized_ms:.0f}x"])
+
+    print_table("History serialization, ms per series", ["bars", "iterrows", "vectorized", "speedup"], rows)
+    checks.finish()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import os
+import time
+from flask import Flask
+from flask_jwt_extended import create_access_token
+from benchmarks.harness import print_table, ms, Checks, in_memory_database
+
+# GET /api/auth/me with and without the identity cache. The JWT user lookup
+# and the route itself both call get_user_by_id, so without the cache every
+# request reads the user twice. Each users.find_one is delayed by
+# DB_LATENCY seconds to stand in for the round trip to the cluster.
+#
+#   python -m benchmarks.bench_identity
+
+DB_LATENCY = float(os.environ.get("DB_LATENCY", 0.02))
+REQUESTS = 50
+
+class SlowCollection:
+    """Wraps a collection, counting find_one calls and delaying each by `latency`"""
+
+    def __init__(self, collection, latency):
+        self.collection = collection
+        self.latency = latency
+        self.reads = 0
+
+    def find_one(self, *args, **kwargs):
+        self.reads += 1
+        time.sleep(self.latency)
+        return self.collection.find_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+class NoCache:
+    """identity_cache stand-in that never holds anything: the pre-cache behaviour"""
+
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+def make_app():
+    from routes.auth_routes import auth_bp, jwt
+    from utils.json_provider import MongoJSONProvider
+
+    app = Flask(__name__)
+    app.json = MongoJSONProvider(app)
+    app.config['JWT_SECRET_KEY'] = 'benchmark-only-jwt-secret-at-least-32-bytes'
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False
+    jwt.init_app(app)
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    return app
+
+def main():
+    db = in_memory_database()
+    from services import auth_service
+
+    user_id = str(db.users.insert_one({"username": "bench", "email": "bench@example.com",
+                                       "password": "not-a-real-hash"}).inserted_id)
+    users = SlowCollection(db.users, DB_LATENCY)
+    auth_service.users_collection = users
+
+    app = make_app()
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity=user_id)}"}
+    client = app.test_client()
+    checks = Checks()
+
+    identity_cache = auth_service.identity_cache
+
+    def run(cache):
+        auth_service.identity_cache = cache
+        cache.clear()
+        users.reads = 0
+        bodies = []
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            response = client.get('/api/auth/me', headers=headers)
+            bodies.append(response.get_json())
+        return (time.perf_counter() - start) * 1000 / REQUESTS, users.reads, bodies
+
+    uncached_ms, uncached_reads, uncached_bodies = run(NoCache())
+    cached_ms, cached_reads, cached_bodies = run(identity_cache)
+
+    checks.expect(cached_bodies == uncached_bodies, "cached and uncached responses are identical")
+    checks.expect(cached_reads == 1, f"{REQUESTS} cached requests read the user once ({cached_reads} reads)")
+    checks.expect(uncached_reads == 2 * REQUESTS, f"uncached requests read the user twice each ({uncached_reads} reads)")
+
+    db.users.update_one({"username": "bench"}, {"$set": {"username": "renamed"}})
+    auth_service.invalidate_user_identity(user_id)
+    renamed = client.get('/api/auth/me', headers=headers).get_json()["data"]["username"]
+    checks.expect(renamed == "renamed", "a rename is visible on the next request after invalidation")
+
+    print_table(f"GET /api/auth/me, {REQUESTS} requests ({DB_LATENCY * 1000:.0f} ms per user read)",
+                ["", "ms per request", "user reads"], [
+                    ["uncached", ms(uncached_ms), uncached_reads],
+                    ["identity_cache", ms(cached_ms), cached_reads],
+                ])
+    checks.finish()
+
+if __name__ == '__main__':
+    main()
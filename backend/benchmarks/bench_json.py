@@ -0,0 +1,98 @@
+import json
+from datetime import datetime, timedelta
+from bson import ObjectId
+from flask import Flask, jsonify
+from benchmarks.harness import best_of, print_table, ms, Checks
+from benchmarks.bench_history_serialization import ohlcv_frame
+from services.stock_service import history_columns, history_records
+from utils import json_provider
+from utils.json_provider import MongoJSONProvider
+
+# Response encoding with Flask's default JSON provider against
+# MongoJSONProvider, on the two heaviest payloads: a 5y daily history and a
+# 200-holding portfolio. The portfolio baseline includes the
+# serialize_document() pass the route used to run before jsonify.
+#
+#   python -m benchmarks.bench_json
+
+HISTORY_BARS = 1260
+HOLDINGS = 200
+
+def serialize_document(doc):
+    """The portfolio route's pre-provider conversion of ObjectId/datetime values"""
+    if doc is None:
+        return None
+    if isinstance(doc, list):
+        return [serialize_document(item) for item in doc]
+    if not isinstance(doc, dict):
+        return doc
+    serialized = {}
+    for key, value in doc.items():
+        if isinstance(value, ObjectId):
+            serialized[key] = str(value)
+        elif isinstance(value, datetime):
+            serialized[key] = value.isoformat()
+        elif isinstance(value, dict):
+            serialized[key] = serialize_document(value)
+        elif isinstance(value, list):
+            serialized[key] = [serialize_document(item) for item in value]
+        else:
+            serialized[key] = value
+    return serialized
+
+def holdings(count):
+    user_id = ObjectId()
+    added = datetime(2024, 1, 2, 15, 30)
+    return [{
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "symbol": f"SYM{i:03d}",
+        "quantity": 10 + i,
+        "avg_price": 100 + i * 0.37,
+        "current_price": 101 + i * 0.41,
+        "current_value": (10 + i) * (101 + i * 0.41),
+        "gain_loss": (10 + i) * (1 + i * 0.04),
+        "created_at": added + timedelta(days=i),
+        "updated_at": added + timedelta(days=i, hours=1),
+    } for i in range(count)]
+
+def encoded(app, payload):
+    with app.app_context():
+        return jsonify(payload).get_data()
+
+def main():
+    default_app = Flask("default")
+    provider_app = Flask("provider")
+    provider_app.json = MongoJSONProvider(provider_app)
+    checks = Checks()
+
+    history = {"success": True, "data": history_records(history_columns(ohlcv_frame(HISTORY_BARS)))}
+    portfolio = holdings(HOLDINGS)
+
+    default_history = encoded(default_app, history)
+    provider_history = encoded(provider_app, history)
+    checks.expect(json.loads(provider_history) == json.loads(default_history), "history: same JSON document")
+    checks.expect(len(provider_history) == len(default_history),
+                  f"history: same body size ({len(provider_history):,} vs {len(default_history):,} bytes)")
+
+    # Naive datetimes are now marked UTC; otherwise the documents match
+    expected = serialize_document(portfolio)
+    for holding in expected:
+        holding["created_at"] += "+00:00"
+        holding["updated_at"] += "+00:00"
+    checks.expect(json.loads(encoded(provider_app, {"data": portfolio})) == {"data": expected},
+                  "portfolio: same document as serialize_document, with UTC-marked datetimes")
+
+    rows = [
+        [f"{HISTORY_BARS}-bar history", ms(best_of(lambda: encoded(default_app, history), repeat=7)),
+         ms(best_of(lambda: encoded(provider_app, history), repeat=7))],
+        [f"{HOLDINGS}-holding portfolio", ms(best_of(lambda: encoded(default_app, {"data": serialize_document(portfolio)}), repeat=7)),
+         ms(best_of(lambda: encoded(provider_app, {"data": portfolio}), repeat=7))],
+    ]
+    backend = "orjson" if json_provider.orjson is not None else "stdlib fallback"
+    print_table(f"jsonify, ms per response (MongoJSONProvider on {backend})",
+                ["payload", "default provider", "MongoJSONProvider"], rows)
+    checks.finish()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import os
+import time
+import types
+import pandas as pd
+from benchmarks.harness import best_of, print_table, ms, Checks
+from services import history_store, stock_service
+
+# get_multiple_stocks against a stand-in for yfinance that sleeps
+# UPSTREAM_LATENCY seconds per call, so the numbers reflect round trips rather
+# than Yahoo's mood. The serial baseline is the pre-batching loop: one full
+# Ticker lookup per symbol plus the 0.1 s pause between symbols.
+#
+#   python -m benchmarks.bench_quotes
+
+UPSTREAM_LATENCY = float(os.environ.get("UPSTREAM_LATENCY", 0.15))
+SIZES = (8, 40)
+SERIAL_PAUSE = 0.1
+
+def symbols_for(count):
+    return [f"SYM{i:03d}" for i in range(count)]
+
+def last_bars(symbol):
+    """Deterministic last two daily bars per symbol: (previous close, close, high, low, volume)"""
+    base = 50 + sum(map(ord, symbol)) % 400
+    return base - 1.25, base + 0.5, base + 2.0, base - 2.0, 1_000_000 + base
+
+class FakeTicker:
+    def __init__(self, upstream, symbol):
+        self.upstream = upstream
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        self.upstream.call()
+        return {"shortName": f"{self.symbol} Corp", "marketCap": 10 ** 9, "exchange": "NMS", "sector": "Technology"}
+
+    @property
+    def fast_info(self):
+        self.upstream.call()
+        previous_close, close, high, low, volume = last_bars(self.symbol)
+        return {"last_price": close, "previous_close": previous_close, "day_high": high,
+                "day_low": low, "last_volume": volume}
+
+class FakeYahoo:
+    """Just enough of yfinance for the quote paths: Ticker(...).info/.fast_info and download()"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def call(self):
+        self.calls += 1
+        time.sleep(self.latency)
+
+    def Ticker(self, symbol):
+        return FakeTicker(self, symbol)
+
+    def download(self, symbols, **kwargs):
+        self.call()
+        dates = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=2)
+        columns = {}
+        for symbol in symbols:
+            previous_close, close, high, low, volume = last_bars(symbol)
+            columns.update({(symbol, "Open"): [previous_close, close], (symbol, "High"): [previous_close, high],
+                            (symbol, "Low"): [previous_close, low], (symbol, "Close"): [previous_close, close],
+                            (symbol, "Volume"): [volume, volume]})
+        return pd.DataFrame(columns, index=dates)
+
+    def module(self):
+        return types.SimpleNamespace(Ticker=self.Ticker, download=self.download)
+
+def serial_quotes(symbols):
+    """The original get_multiple_stocks: one uncached lookup per symbol, paced by a fixed sleep"""
+    quotes = []
+    for symbol in symbols:
+        quotes.append(stock_service._fetch_stock_data(symbol))
+        time.sleep(SERIAL_PAUSE)
+    return quotes
+
+def comparable(quotes):
+    return [{key: value for key, value in quote.items() if key != "last_updated"} for quote in quotes]
+
+def cold_caches():
+    stock_service.stock_cache.clear()
+    stock_service.profile_cache.clear()
+
+def main():
+    upstream = FakeYahoo(UPSTREAM_LATENCY)
+    stock_service.yf = history_store.yf = upstream.module()
+    checks = Checks()
+
+    rows = []
+    for count in SIZES:
+        symbols = symbols_for(count)
+
+        # The serial loop is slow enough that its one checked run is also its timing
+        cold_caches()
+        start = time.perf_counter()
+        serial = serial_quotes(symbols)
+        serial_ms = (time.perf_counter() - start) * 1000
+        cold_caches()
+        batched = stock_service.get_multiple_stocks(symbols)
+        checks.expect(comparable(batched) == comparable(serial), f"{count} symbols: batched quotes equal serial quotes")
+
+        cold_caches()
+        upstream.calls = 0
+        stock_service.get_multiple_stocks(symbols)
+        cold_calls = upstream.calls
+        checks.expect(cold_calls == count + 1, f"{count} symbols: one download plus one profile call per symbol ({cold_calls} calls)")
+
+        def run_cold():
+            cold_caches()
+            stock_service.get_multiple_stocks(symbols)
+
+        def run_warm_profiles():
+            stock_service.stock_cache.clear()
+            stock_service.get_multiple_stocks(symbols)
+
+        rows.append([count, ms(serial_ms), ms(best_of(run_cold, repeat=3)),
+                     ms(best_of(run_warm_profiles, repeat=3))])
+
+    print_table(f"get_multiple_stocks, ms per call ({UPSTREAM_LATENCY * 1000:.0f} ms upstream latency)",
+                ["symbols", "serial", "batched", "batched, warm profiles"], rows)
+    checks.finish()
+
+if __name__ == '__main__':
+    main()
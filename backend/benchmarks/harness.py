@@ -0,0 +1,53 @@
+import time
+
+# Shared helpers for the scripts in this package. Each benchmark is run from
+# the backend directory as a module, e.g. `python -m benchmarks.bench_indicators`,
+# prints a table of timings and exits non-zero if a correctness check fails.
+# Scripts that import Mongo-backed services run them against an in-memory
+# mongomock database (pip install mongomock), so no cluster is needed.
+
+def best_of(fn, repeat=5, number=1):
+    """Best wall time of `number` calls to fn(), in milliseconds per call"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1000
+
+def in_memory_database():
+    """Point database.get_database() at an in-memory mongomock database.
+
+    Must run before importing any service module, since those grab the
+    database at import time.
+    """
+    import mongomock
+    import database
+    database._client = mongomock.MongoClient()
+    database._db = database._client["benchmarks"]
+    return database._db
+
+def print_table(title, header, rows):
+    widths = [max(len(str(cell)) for cell in column) for column in zip(header, *rows)]
+    print(f"\n{title}")
+    for row in [header] + rows:
+        print("  ".join(str(cell).rjust(width) for cell, width in zip(row, widths)))
+
+def ms(value):
+    return "-" if value is None else f"{value:.3f}"
+
+class Checks:
+    """Collects correctness failures so every check runs before the script exits"""
+
+    def __init__(self):
+        self.failures = []
+
+    def expect(self, ok, label):
+        print(f"{'✅' if ok else '❌'} {label}")
+        if not ok:
+            self.failures.append(label)
+
+    def finish(self):
+        if self.failures:
+            raise SystemExit(f"{len(self.failures)} check(s) failed: {'; '.join(self.failures)}")
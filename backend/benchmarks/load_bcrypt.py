@@ -0,0 +1,142 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import numpy as np
+from benchmarks.harness import print_table, ms, Checks
+
+# Load test for bcrypt under the eventlet worker. A child process serves the
+# auth and stock blueprints from a monkey-patched eventlet WSGI server, like
+# gunicorn's eventlet worker. This process fires CONCURRENT_LOGINS logins at
+# once while a separate thread keeps polling /api/stock/AAPL, which is served
+# from the quote cache. With bcrypt run inline on the hub, every hash stalls
+# the quote requests; offloaded to a native thread, they keep flowing.
+#
+#   python -m benchmarks.load_bcrypt
+
+CONCURRENT_LOGINS = int(os.environ.get("CONCURRENT_LOGINS", 24))
+BASELINE_SECONDS = 2
+# Offloaded hashing must keep the p99 quote latency under this during the storm
+OFFLOADED_P99_LIMIT_MS = 100
+
+PASSWORD = "load-test-password"
+EMAIL = "load@example.com"
+
+def serve(mode):
+    """Child process: an eventlet WSGI server with bcrypt inline or offloaded"""
+    import eventlet
+    eventlet.monkey_patch()
+    from eventlet import wsgi
+    from flask import Flask
+    from flask_jwt_extended import create_access_token
+    from benchmarks.harness import in_memory_database
+
+    db = in_memory_database()
+    from routes.auth_routes import auth_bp, jwt
+    from routes.stock_routes import stock_bp
+    from services import auth_service, stock_service
+    from utils.json_provider import MongoJSONProvider
+
+    if mode == "inline":
+        # How register/login called Flask-Bcrypt before: straight on the hub
+        auth_service._run_blocking = lambda fn, *args: fn(*args)
+
+    app = Flask(__name__)
+    app.json = MongoJSONProvider(app)
+    app.config['JWT_SECRET_KEY'] = 'benchmark-only-jwt-secret-at-least-32-bytes'
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False
+    jwt.init_app(app)
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(stock_bp, url_prefix='/api')
+
+    user_id = db.users.insert_one({"username": "load", "email": EMAIL,
+                                   "password": auth_service.hash_password(PASSWORD)}).inserted_id
+    stock_service.stock_cache.set("AAPL", stock_service._build_quote(
+        "AAPL", {"name": "Apple Inc."}, 190.0, 188.5, 191.0, 187.0, 50_000_000), ttl=3600)
+    with app.app_context():
+        token = create_access_token(identity=str(user_id))
+
+    listener = eventlet.listen(("127.0.0.1", 0))
+    print(json.dumps({"token": token, "port": listener.getsockname()[1]}), flush=True)
+    wsgi.server(listener, app, log_output=False)
+
+def request(url, data=None, headers=None):
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json", **(headers or {})})
+    with urllib.request.urlopen(req, timeout=120) as response:
+        return response.status
+
+def poll(url, headers, stop):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        request(url, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def run(mode):
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.load_bcrypt", "--serve", mode],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        ready = json.loads(server.stdout.readline())
+        base = f"http://127.0.0.1:{ready['port']}"
+        headers = {"Authorization": f"Bearer {ready['token']}"}
+
+        def measure(load):
+            stop = threading.Event()
+            latencies = []
+            poller = threading.Thread(target=lambda: latencies.extend(poll(f"{base}/api/stock/AAPL", headers, stop)))
+            poller.start()
+            result = load()
+            stop.set()
+            poller.join()
+            return result, latencies
+
+        _, baseline = measure(lambda: time.sleep(BASELINE_SECONDS))
+
+        def logins():
+            statuses = [None] * CONCURRENT_LOGINS
+
+            def login(i):
+                statuses[i] = request(f"{base}/api/auth/login", {"email": EMAIL, "password": PASSWORD})
+
+            threads = [threading.Thread(target=login, args=(i,)) for i in range(CONCURRENT_LOGINS)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return statuses, (time.perf_counter() - start) * 1000
+
+        (statuses, storm_ms), storm = measure(logins)
+        return baseline, storm, statuses, storm_ms
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    checks = Checks()
+    rows = []
+    for mode in ("inline", "offloaded"):
+        baseline, storm, statuses, storm_ms = run(mode)
+        checks.expect(statuses == [200] * CONCURRENT_LOGINS, f"{mode}: all {CONCURRENT_LOGINS} logins succeeded")
+        p99 = float(np.percentile(storm, 99))
+        if mode == "offloaded":
+            checks.expect(p99 < OFFLOADED_P99_LIMIT_MS,
+                          f"offloaded: quote p99 during the logins {p99:.0f} ms < {OFFLOADED_P99_LIMIT_MS} ms")
+        rows.append([mode, ms(float(np.percentile(baseline, 99))), ms(float(np.percentile(storm, 50))),
+                     ms(p99), ms(max(storm)), len(storm), ms(storm_ms)])
+
+    rounds = os.environ.get("BCRYPT_LOG_ROUNDS", "12")
+    print_table(f"/api/stock/AAPL latency (ms) while {CONCURRENT_LOGINS} logins run at bcrypt cost {rounds}",
+                ["bcrypt", "idle p99", "p50", "p99", "max", "quotes served", "logins took"], rows)
+    checks.finish()
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ["--serve"]:
+        serve(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,94 @@
+import sys
+from datetime import datetime
+from bson import ObjectId
+from database import get_database
+from database.indexes import INDEXES, is_required
+
+# Clears the duplicates that keep a unique index in database.indexes from
+# building, so ensure_indexes() lets the app start:
+#
+#   python -m database.dedupe           # report what would change
+#   python -m database.dedupe --apply   # change it, then restart the app
+#
+# Nothing a user owns is dropped: duplicate holdings and watchlists are merged
+# into the oldest document, and accounts sharing an email or username keep
+# the oldest as is while the others get a value marked "+duplicate-<id>".
+
+def duplicate_groups(collection, keys):
+    """[(key values, [documents, oldest first])] for every key shared by more than one document"""
+    pipeline = [
+        {"$group": {"_id": {key: f"${key}" for key in keys}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    return [
+        (group["_id"], list(collection.find({"_id": {"$in": group["ids"]}}).sort("_id", 1)))
+        for group in collection.aggregate(pipeline)
+    ]
+
+def merge_holdings(db, keeper, duplicates, keys):
+    """One holding for the symbol: quantities and cost basis added up, average price recomputed"""
+    holdings = [keeper] + duplicates
+    quantity = sum(holding.get("quantity") or 0 for holding in holdings)
+    total_investment = sum(holding.get("total_investment") or 0 for holding in holdings)
+    notes = [holding.get("notes") for holding in holdings if holding.get("notes")]
+    db.portfolio.update_one({"_id": keeper["_id"]}, {"$set": {
+        "quantity": quantity,
+        "total_investment": total_investment,
+        "average_price": total_investment / quantity if quantity else keeper.get("average_price", 0),
+        "notes": "\n".join(dict.fromkeys(notes)),
+        "updated_at": datetime.utcnow()
+    }})
+    db.portfolio.delete_many({"_id": {"$in": [holding["_id"] for holding in duplicates]}})
+    # Rebuilt from the merged holdings on the next read
+    db.portfolio_aggregates.delete_one({"_id": keeper["user_id"]})
+    _reset_profile_stats(db, keeper["user_id"])
+
+def merge_watchlists(db, keeper, duplicates, keys):
+    """One watchlist per user holding every symbol once, in the order first added"""
+    stocks = {}
+    for watchlist in [keeper] + duplicates:
+        for stock in watchlist.get("stocks", []):
+            stocks.setdefault(stock.get("symbol"), stock)
+    db.watchlist.update_one({"_id": keeper["_id"]}, {"$set": {"stocks": list(stocks.values())}})
+    db.watchlist.delete_many({"_id": {"$in": [watchlist["_id"] for watchlist in duplicates]}})
+    _reset_profile_stats(db, keeper["user_id"])
+
+def rename_users(db, keeper, duplicates, keys):
+    """Keep the oldest account's value; later accounts get a unique, recognisable one"""
+    field = keys[0]
+    for user in duplicates:
+        db.users.update_one({"_id": user["_id"]}, {"$set": {field: f"{user.get(field) or ''}+duplicate-{user['_id']}"}})
+
+def _reset_profile_stats(db, user_id):
+    # Profile stats are backfilled from the real counts when missing
+    if ObjectId.is_valid(user_id):
+        db.users.update_one({"_id": ObjectId(user_id)}, {"$unset": {"stats": ""}})
+
+RESOLVERS = {
+    "portfolio": merge_holdings,
+    "watchlist": merge_watchlists,
+    "users": rename_users
+}
+
+def dedupe(db=None, apply=False):
+    """Find (and with apply=True resolve) duplicates under every unique index.
+
+    Returns {"<collection>.<index>": number of duplicate groups}.
+    """
+    db = db if db is not None else get_database()
+    report = {}
+    for collection, models in INDEXES.items():
+        for model in filter(is_required, models):
+            keys = list(model.document["key"])
+            groups = duplicate_groups(db[collection], keys)
+            report[f"{collection}.{model.document['name']}"] = len(groups)
+            for values, documents in groups:
+                keeper, duplicates = documents[0], documents[1:]
+                print(f"{'🔧' if apply else '⚠️'} {collection} {values}: keeping {keeper['_id']}, "
+                      f"{'resolving' if apply else 'would resolve'} {len(duplicates)} duplicate(s)")
+                if apply:
+                    RESOLVERS[collection](db, keeper, duplicates, keys)
+    return report
+
+if __name__ == '__main__':
+    print(dedupe(apply="--apply" in sys.argv[1:]))
@@ -0,0 +1,125 @@
+from bson import ObjectId
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from database import get_database
+
+# Indexes behind the hot queries, per collection. create_index is a no-op for
+# an index that already exists with the same spec, so ensure_indexes() is safe
+# to run on every startup.
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "portfolio": [
+        IndexModel([("user_id", ASCENDING), ("symbol", ASCENDING)], name="user_symbol_unique", unique=True),
+        IndexModel([("symbol", ASCENDING)], name="symbol"),
+    ],
+    "watchlist": [
+        IndexModel([("user_id", ASCENDING)], name="user_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("stocks.symbol", ASCENDING)], name="user_stock_symbol"),
+        IndexModel([("stocks.symbol", ASCENDING)], name="stock_symbol"),
+    ],
+    "notifications": [
+        IndexModel([("user_id", ASCENDING), ("read", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="user_read_created_id"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_created_id"),
+    ],
+    "alerts": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+        IndexModel([("user_id", ASCENDING), ("active", ASCENDING)], name="user_active"),
+        IndexModel([("active", ASCENDING), ("symbol", ASCENDING)], name="active_symbol"),
+    ],
+}
+
+class RequiredIndexError(RuntimeError):
+    """A unique index that writes rely on for correctness could not be built"""
+
+def is_required(model):
+    # Unique indexes back correctness (one account per email/username, one
+    # watchlist per user, one holding per symbol); the rest only serve speed
+    return bool(model.document.get("unique"))
+
+def ensure_indexes(db=None):
+    """Create any missing indexes; returns the names of performance indexes that could not be created.
+
+    A performance index that fails (e.g. an existing index with the same keys
+    but different options) is reported and skipped so it never blocks
+    startup. A unique index that fails (typically duplicates already in the
+    collection) raises RequiredIndexError after all indexes were attempted:
+    the write paths depend on it, so the app must not start without it.
+    """
+    db = db if db is not None else get_database()
+    failed = []
+    required_failed = []
+    for collection, models in INDEXES.items():
+        for model in models:
+            name = model.document["name"]
+            try:
+                db[collection].create_indexes([model])
+            except OperationFailure as e:
+                (required_failed if is_required(model) else failed).append(f"{collection}.{name}")
+                print(f"{'❌' if is_required(model) else '⚠️'} Could not create index {collection}.{name}: {e}")
+    if required_failed:
+        raise RequiredIndexError(
+            f"Required unique indexes missing: {', '.join(required_failed)} "
+            f"(run `python -m database.dedupe --apply` to resolve the duplicates, then restart)"
+        )
+    print(f"✅ Indexes ensured ({sum(len(models) for models in INDEXES.values()) - len(failed)} ok, {len(failed)} failed)")
+    return failed
+
+def hot_queries():
+    """(label, collection, filter, sort) for the queries the API runs on every request"""
+    user_id = ObjectId()
+    now = datetime.utcnow()
+    after_cursor = {"$or": [{"created_at": {"$lt": now}}, {"created_at": now, "_id": {"$lt": user_id}}]}
+    return [
+        ("users by email", "users", {"email": "user@example.com"}, None),
+        ("users by username", "users", {"username": "user"}, None),
+        ("portfolio by user", "portfolio", {"user_id": user_id}, None),
+        ("portfolio by user+symbol", "portfolio", {"user_id": user_id, "symbol": "AAPL"}, None),
+        ("watchlist by user", "watchlist", {"user_id": str(user_id)}, None),
+        ("notifications by user", "notifications", {"user_id": str(user_id)}, [("created_at", DESCENDING)]),
+        ("notifications unread", "notifications", {"user_id": str(user_id), "read": False}, [("created_at", DESCENDING)]),
+        ("notifications page", "notifications", {"user_id": str(user_id), **after_cursor},
+         [("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ("notifications unread page", "notifications", {"user_id": str(user_id), "read": False, **after_cursor},
+         [("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ("alerts by user", "alerts", {"user_id": user_id}, [("created_at", DESCENDING)]),
+        ("alerts active", "alerts", {"active": True}, None),
+    ]
+
+def plan_stages(plan):
+    """Every stage name in an explain() plan tree (classic and slot-based engine layouts)"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for key in ("queryPlan", "inputStage", "inputStages", "winningPlan", "shards"):
+            if key in plan:
+                stages.extend(plan_stages(plan[key]))
+    elif isinstance(plan, list):
+        for child in plan:
+            stages.extend(plan_stages(child))
+    return stages
+
+def check_query_plans(db=None):
+    """Explain every hot query and raise if any winning plan still scans a whole collection"""
+    db = db if db is not None else get_database()
+    collscans = []
+    for label, collection, query, sort in hot_queries():
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = plan_stages(cursor.limit(20).explain()["queryPlanner"]["winningPlan"])
+        print(f"{'❌' if 'COLLSCAN' in stages else '✅'} {label}: {' <- '.join(stages)}")
+        if "COLLSCAN" in stages:
+            collscans.append(label)
+    if collscans:
+        raise RuntimeError(f"Collection scans in hot queries: {', '.join(collscans)}")
+    return True
+
+if __name__ == '__main__':
+    ensure_indexes()
+    check_query_plans()
@@ -5,8 +5,10 @@ from services.notification_service import (
     get_unread_notification_count,
     mark_notification_as_read,
     mark_all_notifications_as_read,
-    create_notification
+    create_notification,
+    NOTIFICATION_PAGE_SIZE
 )
+from services.alert_service import create_alert as create_price_alert, get_user_alerts
 
 notification_bp = Blueprint('notification', __name__)
 
@@ -16,11 +18,16 @@ def get_notifications():
     try:
         user_id = get_jwt_identity()
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
+        limit = request.args.get('limit', NOTIFICATION_PAGE_SIZE, type=int)
+        cursor = request.args.get('cursor')
         
-        notifications, success = get_user_notifications(user_id, unread_only)
+        try:
+            notifications, next_cursor, success = get_user_notifications(user_id, unread_only, limit, cursor)
+        except ValueError:
+            return jsonify({"success": False, "error": "Invalid cursor"}), 400
         
         if success:
-            return jsonify({"success": True, "data": notifications}), 200
+            return jsonify({"success": True, "data": notifications, "next_cursor": next_cursor}), 200
         else:
             return jsonify({"success": False, "error": "Failed to fetch notifications"}), 500
             
@@ -35,7 +42,7 @@ def get_unread_count():
         count, success = get_unread_notification_count(user_id)
         
         if success:
-            return jsonify({"success": True, "data": count}), 200
+            return jsonify({"success": True, "data": count, "count": count}), 200
         else:
             return jsonify({"success": False, "error": "Failed to get unread count"}), 500
             
@@ -60,8 +67,12 @@ def mark_as_read(notification_id):
 def get_alerts():
     try:
         user_id = get_jwt_identity()
-        # For now, return empty array - implement alert logic later
-        return jsonify({"success": True, "data": []}), 200
+        alerts, success = get_user_alerts(user_id)
+        
+        if success:
+            return jsonify({"success": True, "data": alerts}), 200
+        else:
+            return jsonify({"success": False, "error": "Failed to get alerts"}), 500
     except Exception as e:
         return jsonify({"success": False, "error": "Failed to get alerts"}), 500
 
@@ -76,22 +87,23 @@ def create_alert():
         target_price = data.get('target_price')
         alert_type = data.get('alert_type', 'above')
         
-        # Create notification for the alert
-        notification_id, success = create_notification(
+        alert_id, success = create_price_alert(user_id, symbol, target_price, alert_type)
+        if not success:
+            return jsonify({"success": False, "error": "Failed to create alert"}), 400
+        
+        # Confirm the alert in the user's notifications
+        create_notification(
             user_id, 
-            f"Price Alert Created for {symbol}",
+            f"Price Alert Created for {symbol.upper()}",
             f"Alert when price goes {alert_type} ${target_price}",
             "alert"
         )
         
-        if success:
-            return jsonify({
-                "success": True, 
-                "message": "Alert created successfully",
-                "alert_id": notification_id
-            }), 201
-        else:
-            return jsonify({"success": False, "error": "Failed to create alert"}), 400
+        return jsonify({
+            "success": True, 
+            "message": "Alert created successfully",
+            "alert_id": alert_id
+        }), 201
             
     except Exception as e:
-        return jsonify({"success": False, "error": "Failed to create alert"}), 500
\ No newline at end of file
+        return jsonify({"success": False, "error": "Failed to create alert"}), 500
@@ -2,68 +2,40 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
 from datetime import datetime
-import json
 from database import get_database
+from services.stock_service import get_current_prices
+from services.history_store import PERIODS
+from services.profile_service import adjust_profile_stat
+from services.portfolio_history import portfolio_value_history
+from services.portfolio_aggregates import (
+    get_portfolio_aggregate,
+    ensure_portfolio_aggregate,
+    record_holding_added,
+    record_holding_updated,
+    record_holding_removed
+)
 
 portfolio_bp = Blueprint('portfolio', __name__)
 
-# Custom JSON encoder to handle MongoDB types
-class JSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super(JSONEncoder, self).default(obj)
+def value_holdings(holdings):
+    """Current price, value and P&L for aggregate holding entries (one cached batch price lookup)"""
+    prices = get_current_prices([holding['symbol'] for holding in holdings.values()])
+    valued = []
+    for holding_id, holding in holdings.items():
+        investment = holding.get('total_investment', 0)
+        current_price = round(prices.get(holding['symbol']) or holding.get('average_price', 0), 2)
+        holding_value = current_price * holding.get('quantity', 0)
+        holding_pl = holding_value - investment
+        holding_pl_percentage = (holding_pl / investment * 100) if investment > 0 else 0
+        valued.append((holding_id, holding, current_price, holding_value, holding_pl, holding_pl_percentage))
+    return valued
 
-def serialize_document(doc):
-    """Convert MongoDB document to JSON-serializable format"""
-    if doc is None:
-        return None
-    
-    if isinstance(doc, list):
-        return [serialize_document(item) for item in doc]
-    
-    if not isinstance(doc, dict):
-        return doc
-    
-    serialized = {}
-    for key, value in doc.items():
-        if isinstance(value, ObjectId):
-            serialized[key] = str(value)
-        elif isinstance(value, datetime):
-            serialized[key] = value.isoformat()
-        elif isinstance(value, dict):
-            serialized[key] = serialize_document(value)
-        elif isinstance(value, list):
-            serialized[key] = [serialize_document(item) for item in value]
-        else:
-            serialized[key] = value
-    return serialized
-
-# Mock stock prices (replace with real API)
-MOCK_PRICES = {
-    'AAPL': 185.00,
-    'GOOGL': 145.50,
-    'MSFT': 380.75,
-    'TSLA': 245.30,
-    'AMZN': 155.20,
-    'META': 350.40,
-    'NVDA': 485.25,
-    'NFLX': 490.10
-}
-
-def get_current_price(symbol):
-    """Get current stock price - replace with real API call"""
-    try:
-        # For demo, use mock prices with some random variation
-        base_price = MOCK_PRICES.get(symbol, 100.00)
-        # Add small random variation to simulate real market
-        import random
-        variation = random.uniform(-2.0, 2.0)
-        return round(base_price + variation, 2)
-    except:
-        return 100.00  # Fallback price
+def holding_quantities(aggregate):
+    """Current quantity per symbol ({symbol: quantity}) straight from the aggregate"""
+    quantities = {}
+    for holding in aggregate.get('holdings', {}).values():
+        quantities[holding['symbol']] = quantities.get(holding['symbol'], 0) + holding.get('quantity', 0)
+    return quantities
 
 @portfolio_bp.route('/portfolio', methods=['GET', 'OPTIONS'])
 @jwt_required()
@@ -75,35 +47,22 @@ def get_portfolio():
         current_user_id = get_jwt_identity()
         print(f"📊 Getting portfolio for user ID: {current_user_id}")
         
-        db = get_database()
-        portfolio_collection = db.portfolio
-        
-        # Get all holdings for the user
-        holdings = list(portfolio_collection.find({'user_id': ObjectId(current_user_id)}))
-        
-        # Calculate portfolio totals with real-time prices
-        total_investment = 0
+        # Stored aggregate + current prices; the holdings collection is not scanned
+        aggregate = get_portfolio_aggregate(ObjectId(current_user_id))
+        total_investment = aggregate.get('total_investment', 0)
         current_value = 0
         
         formatted_holdings = []
-        for holding in holdings:
+        for holding_id, holding, current_price, holding_value, holding_pl, holding_pl_percentage in value_holdings(aggregate.get('holdings', {})):
             symbol = holding.get('symbol', '')
             quantity = holding.get('quantity', 0)
             avg_price = holding.get('average_price', 0)
             investment = holding.get('total_investment', 0)
-            
-            # Get real-time current price
-            current_price = get_current_price(symbol)
-            holding_value = current_price * quantity
-            holding_pl = holding_value - investment
-            holding_pl_percentage = (holding_pl / investment * 100) if investment > 0 else 0
-            
-            total_investment += investment
             current_value += holding_value
             
             # Create serialized holding
             serialized_holding = {
-                '_id': str(holding['_id']),
+                '_id': holding_id,
                 'symbol': symbol,
                 'name': holding.get('name', symbol),
                 'quantity': quantity,
@@ -117,19 +76,13 @@ def get_portfolio():
             
             # Add optional fields if they exist
             if holding.get('purchase_date'):
-                if isinstance(holding['purchase_date'], datetime):
-                    serialized_holding['purchase_date'] = holding['purchase_date'].isoformat()
-                else:
-                    serialized_holding['purchase_date'] = holding['purchase_date']
+                serialized_holding['purchase_date'] = holding['purchase_date']
             
             if holding.get('notes'):
                 serialized_holding['notes'] = holding['notes']
                 
             if holding.get('created_at'):
-                if isinstance(holding['created_at'], datetime):
-                    serialized_holding['created_at'] = holding['created_at'].isoformat()
-                else:
-                    serialized_holding['created_at'] = holding['created_at']
+                serialized_holding['created_at'] = holding['created_at']
             
             formatted_holdings.append(serialized_holding)
         
@@ -141,9 +94,9 @@ def get_portfolio():
             'current_value': round(current_value, 2),
             'total_pl': round(total_pl, 2),
             'total_pl_percentage': round(total_pl_percentage, 2),
-            'total_holdings': len(holdings),
+            'total_holdings': aggregate.get('holding_count', 0),
             'holdings': formatted_holdings,
-            'last_updated': datetime.utcnow().isoformat()
+            'last_updated': datetime.utcnow()
         }
         
         print(f"✅ Portfolio retrieved with real-time prices for user: {current_user_id}")
@@ -186,6 +139,8 @@ def add_holding():
         db = get_database()
         portfolio_collection = db.portfolio
         
+        ensure_portfolio_aggregate(ObjectId(current_user_id))
+        
         # Check if holding already exists for this user
         existing_holding = portfolio_collection.find_one({
             'user_id': ObjectId(current_user_id),
@@ -212,32 +167,27 @@ def add_holding():
             'updated_at': datetime.utcnow()
         }
         
-        result = portfolio_collection.insert_one(holding_data)
+        portfolio_collection.insert_one(holding_data)
+        record_holding_added(ObjectId(current_user_id), holding_data)
+        adjust_profile_stat(current_user_id, 'portfolio', 1)
         
-        # Get the inserted document
-        inserted_holding = portfolio_collection.find_one({'_id': result.inserted_id})
-        
-        if not inserted_holding:
-            return jsonify({'success': False, 'error': 'Failed to create holding'}), 500
+        # insert_one set _id on the document; no need to read it back
+        inserted_holding = holding_data
         
         # Serialize the response data
         response_data = {
-            '_id': str(inserted_holding['_id']),
+            '_id': inserted_holding['_id'],
             'symbol': inserted_holding.get('symbol', ''),
             'name': inserted_holding.get('name', ''),
             'quantity': inserted_holding.get('quantity', 0),
             'average_price': inserted_holding.get('average_price', 0),
             'total_investment': inserted_holding.get('total_investment', 0),
-            'user_id': str(inserted_holding.get('user_id', ''))
+            'user_id': inserted_holding.get('user_id', '')
         }
         
         # Add optional fields
         if inserted_holding.get('purchase_date'):
-            purchase_date = inserted_holding['purchase_date']
-            if isinstance(purchase_date, datetime):
-                response_data['purchase_date'] = purchase_date.isoformat()
-            else:
-                response_data['purchase_date'] = purchase_date
+            response_data['purchase_date'] = inserted_holding['purchase_date']
         
         if inserted_holding.get('notes'):
             response_data['notes'] = inserted_holding['notes']
@@ -282,6 +232,8 @@ def update_holding(holding_id):
         if not holding:
             return jsonify({'success': False, 'error': 'Holding not found'}), 404
         
+        ensure_portfolio_aggregate(ObjectId(current_user_id))
+        
         # Prepare update fields
         update_fields = {}
         
@@ -304,14 +256,16 @@ def update_holding(holding_id):
         
         update_fields['updated_at'] = datetime.utcnow()
         
-        # Update holding
-        result = portfolio_collection.update_one(
-            {'_id': ObjectId(holding_id)},
+        # Update holding; the version it replaced gives the aggregate delta
+        previous = portfolio_collection.find_one_and_update(
+            {'_id': ObjectId(holding_id), 'user_id': ObjectId(current_user_id)},
             {'$set': update_fields}
         )
         
-        if result.modified_count == 0:
-            return jsonify({'success': False, 'error': 'No changes made'}), 400
+        if not previous:
+            return jsonify({'success': False, 'error': 'Holding not found'}), 404
+        
+        record_holding_updated(ObjectId(current_user_id), previous, {**previous, **update_fields})
         
         print(f"✅ Holding updated successfully: {holding_id}")
         
@@ -337,8 +291,10 @@ def remove_holding(holding_id):
         db = get_database()
         portfolio_collection = db.portfolio
         
-        # Check if holding exists and belongs to user
-        holding = portfolio_collection.find_one({
+        ensure_portfolio_aggregate(ObjectId(current_user_id))
+        
+        # Delete holding (only if it belongs to the user)
+        holding = portfolio_collection.find_one_and_delete({
             '_id': ObjectId(holding_id),
             'user_id': ObjectId(current_user_id)
         })
@@ -346,11 +302,8 @@ def remove_holding(holding_id):
         if not holding:
             return jsonify({'success': False, 'error': 'Holding not found'}), 404
         
-        # Delete holding
-        result = portfolio_collection.delete_one({'_id': ObjectId(holding_id)})
-        
-        if result.deleted_count == 0:
-            return jsonify({'success': False, 'error': 'Failed to delete holding'}), 500
+        record_holding_removed(ObjectId(current_user_id), holding)
+        adjust_profile_stat(current_user_id, 'portfolio', -1)
         
         print(f"✅ Holding removed successfully: {holding_id}")
         
@@ -373,28 +326,30 @@ def get_portfolio_performance():
         current_user_id = get_jwt_identity()
         print(f"📈 Getting portfolio performance for user ID: {current_user_id}")
         
-        db = get_database()
-        portfolio_collection = db.portfolio
-        
-        # Get all holdings for the user
-        holdings = list(portfolio_collection.find({'user_id': ObjectId(current_user_id)}))
+        aggregate = get_portfolio_aggregate(ObjectId(current_user_id))
+        valued = value_holdings(aggregate.get('holdings', {}))
         
         # Calculate performance metrics
-        total_investment = sum(holding.get('total_investment', 0) for holding in holdings)
-        current_value = sum(get_current_price(holding.get('symbol', '')) * holding.get('quantity', 0) for holding in holdings)
+        total_investment = aggregate.get('total_investment', 0)
+        current_value = sum(holding_value for _, _, _, holding_value, _, _ in valued)
         total_pl = current_value - total_investment
         total_pl_percentage = (total_pl / total_investment * 100) if total_investment > 0 else 0
+        best = max(valued, key=lambda item: item[5]) if valued else None
+        worst = min(valued, key=lambda item: item[5]) if valued else None
+        
+        # Daily change of the whole portfolio: last session of its value series
+        recent = portfolio_value_history(holding_quantities(aggregate), '1mo')['history']
+        last_session = recent[-1] if recent else {'daily_change': 0, 'daily_return': 0}
         
-        # Calculate daily performance (mock data for demo)
         performance_data = {
             'total_investment': round(total_investment, 2),
             'current_value': round(current_value, 2),
             'total_pl': round(total_pl, 2),
             'total_pl_percentage': round(total_pl_percentage, 2),
-            'daily_change': round(total_pl * 0.01, 2),  # Mock data
-            'daily_change_percentage': 1.0,  # Mock data
-            'best_performer': max(holdings, key=lambda x: x.get('average_price', 0)).get('symbol', '') if holdings else '',
-            'worst_performer': min(holdings, key=lambda x: x.get('average_price', 0)).get('symbol', '') if holdings else ''
+            'daily_change': last_session['daily_change'],
+            'daily_change_percentage': last_session['daily_return'],
+            'best_performer': best[1].get('symbol', '') if best else '',
+            'worst_performer': worst[1].get('symbol', '') if worst else ''
         }
         
         print(f"✅ Portfolio performance retrieved for user: {current_user_id}")
@@ -406,4 +361,34 @@ def get_portfolio_performance():
         
     except Exception as e:
         print(f"❌ Portfolio performance error: {e}")
-        return jsonify({'success': False, 'error': 'Failed to fetch portfolio performance'}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': 'Failed to fetch portfolio performance'}), 500
+
+@portfolio_bp.route('/portfolio/history', methods=['GET', 'OPTIONS'])
+@jwt_required()
+def get_portfolio_history():
+    if request.method == 'OPTIONS':
+        return '', 200
+        
+    try:
+        current_user_id = get_jwt_identity()
+        period = request.args.get('period', '1y')
+        print(f"📉 Getting portfolio history ({period}) for user ID: {current_user_id}")
+        
+        if period not in PERIODS:
+            return jsonify({'success': False, 'error': f"Invalid period. Use one of: {', '.join(PERIODS)}"}), 400
+        
+        aggregate = get_portfolio_aggregate(ObjectId(current_user_id))
+        history = portfolio_value_history(holding_quantities(aggregate), period)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'period': period,
+                'interval': PERIODS[period][0],
+                **history
+            }
+        })
+        
+    except Exception as e:
+        print(f"❌ Portfolio history error: {e}")
+        return jsonify({'success': False, 'error': 'Failed to fetch portfolio history'}), 500
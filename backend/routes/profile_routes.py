@@ -1,13 +1,62 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from database import get_database
+from services.profile_service import (
+    PROFILE_PROJECTION,
+    get_cached_user,
+    cache_user,
+    invalidate_profile
+)
 
 # ✅ DEFINE THE BLUEPRINT FIRST (this was missing)
 profile_bp = Blueprint('profile', __name__)
 
 # ✅ NOW YOU CAN USE profile_bp.route DECORATORS
 
+DEFAULT_PREFERENCES = {
+    'emailNotifications': True,
+    'priceAlerts': True,
+    'analysisReports': False,
+    'newsletter': False,
+    'theme': 'light',
+    'defaultTimeframe': '1D',
+    'alertThreshold': 5,
+    'autoRefresh': True,
+    'refreshInterval': 30
+}
+
+def profile_response(user):
+    stats = user.get('stats', {})
+    return {
+        '_id': str(user['_id']),
+        'firstName': user.get('firstName', ''),
+        'lastName': user.get('lastName', ''),
+        'username': user.get('username', ''),
+        'email': user.get('email', ''),
+        'phone': user.get('phone', ''),
+        'bio': user.get('bio', ''),
+        'plan': user.get('plan', 'Premium'),
+        'createdAt': user.get('createdAt'),
+        'stats': {
+            'watchlistCount': stats.get('watchlist', 0),
+            'portfolioCount': stats.get('portfolio', 0),
+            'alertsCount': stats.get('alerts', 0)
+        }
+    }
+
+def taken_field(users, user_id, update_fields):
+    """'username' or 'email' if another account already holds the new value, else None"""
+    claims = [{field: update_fields[field]} for field in ('username', 'email') if field in update_fields]
+    if not claims:
+        return None
+    other = users.find_one({'_id': {'$ne': ObjectId(user_id)}, '$or': claims}, {'username': 1, 'email': 1})
+    if other is None:
+        return None
+    return 'username' if 'username' in update_fields and other.get('username') == update_fields['username'] else 'email'
+
 @profile_bp.route('/user/profile', methods=['GET', 'OPTIONS'])
 @jwt_required()
 def get_user_profile():
@@ -18,35 +67,13 @@ def get_user_profile():
         current_user_id = get_jwt_identity()
         print(f"📋 Getting profile for user ID: {current_user_id}")
         
-        db = get_database()
-        users = db.users
-        
-        user = users.find_one({'_id': ObjectId(current_user_id)})
+        # Cached user document; stats are counters kept on it
+        user = get_cached_user(current_user_id)
         
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
         
-        # Get user stats
-        watchlist_count = db.watchlist.count_documents({'user_id': ObjectId(current_user_id)})
-        portfolio_count = db.portfolio.count_documents({'user_id': ObjectId(current_user_id)})
-        alerts_count = db.alerts.count_documents({'user_id': ObjectId(current_user_id), 'active': True})
-        
-        profile_data = {
-            '_id': str(user['_id']),
-            'firstName': user.get('firstName', ''),
-            'lastName': user.get('lastName', ''),
-            'username': user.get('username', ''),
-            'email': user.get('email', ''),
-            'phone': user.get('phone', ''),
-            'bio': user.get('bio', ''),
-            'plan': user.get('plan', 'Premium'),
-            'createdAt': user.get('createdAt'),
-            'stats': {
-                'watchlistCount': watchlist_count,
-                'portfolioCount': portfolio_count,
-                'alertsCount': alerts_count
-            }
-        }
+        profile_data = profile_response(user)
         
         print(f"✅ Profile retrieved for user: {user['username']}")
         
@@ -75,14 +102,6 @@ def update_user_profile():
         if not data:
             return jsonify({'success': False, 'error': 'No data provided'}), 400
         
-        db = get_database()
-        users = db.users
-        
-        # Check if user exists
-        user = users.find_one({'_id': ObjectId(current_user_id)})
-        if not user:
-            return jsonify({'success': False, 'error': 'User not found'}), 404
-        
         # Prepare update fields
         update_fields = {}
         
@@ -92,27 +111,9 @@ def update_user_profile():
         if 'lastName' in data:
             update_fields['lastName'] = data['lastName'].strip()
         if 'username' in data:
-            new_username = data['username'].strip()
-            if new_username != user.get('username'):
-                # Check if username is already taken
-                existing_user = users.find_one({
-                    'username': new_username,
-                    '_id': {'$ne': ObjectId(current_user_id)}
-                })
-                if existing_user:
-                    return jsonify({'success': False, 'error': 'Username already taken'}), 400
-            update_fields['username'] = new_username
+            update_fields['username'] = data['username'].strip()
         if 'email' in data:
-            new_email = data['email'].strip().lower()
-            if new_email != user.get('email'):
-                # Check if email is already taken
-                existing_user = users.find_one({
-                    'email': new_email,
-                    '_id': {'$ne': ObjectId(current_user_id)}
-                })
-                if existing_user:
-                    return jsonify({'success': False, 'error': 'Email already taken'}), 400
-            update_fields['email'] = new_email
+            update_fields['email'] = data['email'].strip().lower()
         if 'phone' in data:
             update_fields['phone'] = data['phone'].strip()
         if 'bio' in data:
@@ -121,38 +122,42 @@ def update_user_profile():
         if not update_fields:
             return jsonify({'success': False, 'error': 'No valid fields to update'}), 400
         
-        # Update user in database
-        result = users.update_one(
-            {'_id': ObjectId(current_user_id)},
-            {'$set': update_fields}
-        )
+        db = get_database()
+        users = db.users
         
-        if result.modified_count == 0:
+        # Username/email held by another account (one lookup); the unique
+        # indexes, required at startup, also reject a concurrent claim below
+        taken = taken_field(users, current_user_id, update_fields)
+        if taken:
+            return jsonify({'success': False, 'error': f'{taken.capitalize()} already taken'}), 400
+        
+        # The filter only matches if something actually changes
+        try:
+            updated_user = users.find_one_and_update(
+                {
+                    '_id': ObjectId(current_user_id),
+                    '$or': [{field: {'$ne': value}} for field, value in update_fields.items()]
+                },
+                {'$set': update_fields},
+                projection=PROFILE_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError as e:
+            key = (e.details or {}).get('keyPattern') or {}
+            field = next((field for field in ('username', 'email') if field in key), None)
+            field = field or taken_field(users, current_user_id, update_fields) or 'email'
+            return jsonify({'success': False, 'error': f'{field.capitalize()} already taken'}), 400
+        
+        if not updated_user:
+            if users.count_documents({'_id': ObjectId(current_user_id)}, limit=1) == 0:
+                return jsonify({'success': False, 'error': 'User not found'}), 404
             return jsonify({'success': False, 'error': 'No changes made'}), 400
         
-        # Get updated user data
-        updated_user = users.find_one({'_id': ObjectId(current_user_id)})
-        
-        # Get updated stats
-        watchlist_count = db.watchlist.count_documents({'user_id': ObjectId(current_user_id)})
-        portfolio_count = db.portfolio.count_documents({'user_id': ObjectId(current_user_id)})
-        alerts_count = db.alerts.count_documents({'user_id': ObjectId(current_user_id), 'active': True})
-        
-        response_data = {
-            '_id': str(updated_user['_id']),
-            'firstName': updated_user.get('firstName', ''),
-            'lastName': updated_user.get('lastName', ''),
-            'username': updated_user.get('username', ''),
-            'email': updated_user.get('email', ''),
-            'phone': updated_user.get('phone', ''),
-            'bio': updated_user.get('bio', ''),
-            'plan': updated_user.get('plan', 'Premium'),
-            'stats': {
-                'watchlistCount': watchlist_count,
-                'portfolioCount': portfolio_count,
-                'alertsCount': alerts_count
-            }
-        }
+        invalidate_profile(current_user_id)
+        cache_user(updated_user)
+        updated_user = get_cached_user(current_user_id) or updated_user
+        
+        response_data = profile_response(updated_user)
         
         print(f"✅ Profile updated successfully for user: {updated_user['username']}")
         
@@ -176,30 +181,14 @@ def get_user_preferences():
         current_user_id = get_jwt_identity()
         print(f"⚙️ Getting preferences for user ID: {current_user_id}")
         
-        db = get_database()
-        users = db.users
-        
-        user = users.find_one({'_id': ObjectId(current_user_id)})
+        user = get_cached_user(current_user_id)
         
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
         
-        # Default preferences
-        default_preferences = {
-            'emailNotifications': True,
-            'priceAlerts': True,
-            'analysisReports': False,
-            'newsletter': False,
-            'theme': 'light',
-            'defaultTimeframe': '1D',
-            'alertThreshold': 5,
-            'autoRefresh': True,
-            'refreshInterval': 30
-        }
-        
-        # Merge with user's existing preferences
+        # Merge defaults with user's existing preferences
         user_preferences = user.get('preferences', {})
-        preferences = {**default_preferences, **user_preferences}
+        preferences = {**DEFAULT_PREFERENCES, **user_preferences}
         
         print(f"✅ Preferences retrieved for user: {user['username']}")
         
@@ -233,28 +222,13 @@ def update_user_preferences():
         if not preferences:
             return jsonify({'success': False, 'error': 'No preferences data provided'}), 400
         
-        db = get_database()
-        users = db.users
-        
-        # Check if user exists
-        user = users.find_one({'_id': ObjectId(current_user_id)})
+        # Check if user exists (cached read)
+        user = get_cached_user(current_user_id)
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
         
         # Get current preferences (merge with defaults)
-        default_preferences = {
-            'emailNotifications': True,
-            'priceAlerts': True,
-            'analysisReports': False,
-            'newsletter': False,
-            'theme': 'light',
-            'defaultTimeframe': '1D',
-            'alertThreshold': 5,
-            'autoRefresh': True,
-            'refreshInterval': 30
-        }
-        
-        current_preferences = {**default_preferences, **user.get('preferences', {})}
+        current_preferences = {**DEFAULT_PREFERENCES, **user.get('preferences', {})}
         
         # Validate and prepare preferences
         update_preferences = {}
@@ -317,30 +291,28 @@ def update_user_preferences():
                 'data': update_preferences
             })
         
-        # Merge with existing preferences
-        final_preferences = {**current_preferences, **update_preferences}
-        
-        # Update preferences in database
-        result = users.update_one(
+        # Set only the keys that change, and cache the document the update returns
+        users = get_database().users
+        updated_user = users.find_one_and_update(
             {'_id': ObjectId(current_user_id)},
-            {'$set': {'preferences': final_preferences}}
+            {'$set': {f'preferences.{key}': value for key, value in update_preferences.items()
+                      if current_preferences.get(key) != value}},
+            projection=PROFILE_PROJECTION,
+            return_document=ReturnDocument.AFTER
         )
+        if not updated_user:
+            invalidate_profile(current_user_id)
+            return jsonify({'success': False, 'error': 'User not found'}), 404
+        cache_user(updated_user)
         
-        if result.modified_count > 0:
-            print(f"✅ Preferences updated successfully for user: {user['username']}")
-            return jsonify({
-                'success': True,
-                'message': 'Preferences updated successfully',
-                'data': final_preferences
-            })
-        else:
-            # Even if no documents were modified, consider it success
-            print(f"ℹ️ Preferences already up to date for user: {user['username']}")
-            return jsonify({
-                'success': True,
-                'message': 'Preferences are already up to date',
-                'data': final_preferences
-            })
+        final_preferences = {**DEFAULT_PREFERENCES, **updated_user.get('preferences', {})}
+        
+        print(f"✅ Preferences updated successfully for user: {user['username']}")
+        return jsonify({
+            'success': True,
+            'message': 'Preferences updated successfully',
+            'data': final_preferences
+        })
         
     except Exception as e:
         print(f"❌ Preferences update error: {e}")
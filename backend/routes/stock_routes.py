@@ -1,10 +1,32 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
-from services.stock_service import get_stock_data, get_stock_history, get_multiple_stocks, get_live_price, get_detailed_stock_history
+from services.stock_service import (
+    get_stock_data,
+    get_multiple_stocks,
+    get_live_price,
+    get_stock_history_columns,
+    get_detailed_stock_history_columns,
+    history_records,
+    OHLC_FIELDS
+)
+from utils.encodings import negotiated_response
 from datetime import datetime
 
 stock_bp = Blueprint('stock', __name__)
 
+# History layouts selectable with ?format=: "rows" (default) is one object per
+# bar; "columnar" is one array per field, so key names aren't repeated per bar.
+# Either layout is sent as MessagePack instead of JSON when the Accept header
+# asks for application/msgpack.
+HISTORY_FORMATS = ('rows', 'columnar')
+
+def history_response(columns):
+    history_format = request.args.get('format', 'rows')
+    if history_format not in HISTORY_FORMATS:
+        return jsonify({"success": False, "error": f"Invalid format. Use one of: {', '.join(HISTORY_FORMATS)}"}), 400
+    data = columns if history_format == 'columnar' else history_records(columns)
+    return negotiated_response({"success": True, "format": history_format, "data": data})
+
 @stock_bp.route('/stock/<symbol>', methods=['GET'])
 @jwt_required()
 def get_stock(symbol):
@@ -33,8 +55,7 @@ def get_multiple_stocks_route():
 def get_stock_history_route(symbol):
     try:
         period = request.args.get('period', '6mo')
-        history_data = get_stock_history(symbol, period)
-        return jsonify({"success": True, "data": history_data})
+        return history_response(get_stock_history_columns(symbol, period))
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -44,8 +65,7 @@ def get_detailed_stock_history_route(symbol):
     """Get detailed historical data with technical indicators"""
     try:
         period = request.args.get('period', '6mo')
-        detailed_data = get_detailed_stock_history(symbol, period)
-        return jsonify({"success": True, "data": detailed_data})
+        return history_response(get_detailed_stock_history_columns(symbol, period))
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -55,22 +75,10 @@ def get_ohlc_history_route(symbol):
     """Get OHLC data specifically for candlestick charts"""
     try:
         period = request.args.get('period', '3mo')
-        history_data = get_stock_history(symbol, period)
-        
-        # Format specifically for candlestick charts
-        ohlc_data = []
-        for item in history_data:
-            ohlc_data.append({
-                "date": item["date"],
-                "timestamp": item["timestamp"],
-                "open": item["open"],
-                "high": item["high"],
-                "low": item["low"],
-                "close": item["close"],
-                "volume": item["volume"]
-            })
+        columns = get_stock_history_columns(symbol, period)
         
-        return jsonify({"success": True, "data": ohlc_data})
+        # Only the fields candlestick charts use
+        return history_response({field: columns[field] for field in OHLC_FIELDS})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -1,6 +1,6 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from services.watchlist_service import get_user_watchlist, add_to_watchlist, remove_from_watchlist
+from services.watchlist_service import get_user_watchlist, add_to_watchlist, remove_from_watchlist, is_in_watchlist
 
 watchlist_bp = Blueprint('watchlist', __name__)
 
@@ -61,8 +61,6 @@ def remove_stock_from_watchlist(symbol):
 def check_watchlist(symbol):
     try:
         user_id = get_jwt_identity()
-        watchlist = get_user_watchlist(user_id)
-        is_in_watchlist = any(stock['symbol'] == symbol for stock in watchlist)
-        return jsonify({"success": True, "in_watchlist": is_in_watchlist}), 200
+        return jsonify({"success": True, "in_watchlist": is_in_watchlist(user_id, symbol)}), 200
     except Exception as e:
         return jsonify({"success": False, "error": "Failed to check watchlist"}), 500
\ No newline at end of file
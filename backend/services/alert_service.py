@@ -0,0 +1,182 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from bson import ObjectId
+from database import get_database
+from services.notification_service import queue_notification
+from services.profile_service import adjust_profile_stat, adjust_profile_stats
+from services.stock_service import is_fresh_quote
+
+db = get_database()
+alerts_collection = db.alerts
+
+ALERT_CONDITIONS = ("above", "below")
+
+_socketio = None
+
+def user_room(user_id):
+    return f"user:{user_id}"
+
+class AlertIndex:
+    """Active price alerts per symbol, kept sorted by target price.
+
+    "above" alerts fire once the price reaches their target, so for a tick
+    they are exactly the prefix of the ascending target list up to
+    bisect_right(price); "below" alerts are the suffix from bisect_left(price).
+    Each tick therefore costs O(log n + fired) instead of a scan.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.alerts = {}  # alert_id -> alert
+        self.targets = {}  # (symbol, condition) -> ([target_price], [alert_id]) sorted by price
+
+    def __len__(self):
+        return len(self.alerts)
+
+    def load(self, alerts):
+        """Replace the index contents with `alerts` (sorted once, not inserted one by one)"""
+        grouped = {}
+        for alert in alerts:
+            grouped.setdefault((alert["symbol"], alert["condition"]), []).append((alert["target_price"], alert["_id"]))
+        with self.lock:
+            self.alerts = {alert["_id"]: alert for alert in alerts}
+            self.targets = {}
+            for key, entries in grouped.items():
+                entries.sort()
+                self.targets[key] = ([price for price, _ in entries], [alert_id for _, alert_id in entries])
+
+    def add(self, alert):
+        with self.lock:
+            prices, ids = self.targets.setdefault((alert["symbol"], alert["condition"]), ([], []))
+            position = bisect_right(prices, alert["target_price"])
+            prices.insert(position, alert["target_price"])
+            ids.insert(position, alert["_id"])
+            self.alerts[alert["_id"]] = alert
+
+    def pop_triggered(self, symbol, price):
+        """Remove and return every alert on `symbol` crossed by `price`"""
+        with self.lock:
+            fired = []
+            above = self.targets.get((symbol, "above"))
+            if above:
+                end = bisect_right(above[0], price)
+                fired.extend(above[1][:end])
+                del above[0][:end], above[1][:end]
+            below = self.targets.get((symbol, "below"))
+            if below:
+                start = bisect_left(below[0], price)
+                fired.extend(below[1][start:])
+                del below[0][start:], below[1][start:]
+            return [self.alerts.pop(alert_id) for alert_id in fired]
+
+alert_index = AlertIndex()
+_index_loaded = False
+_load_lock = threading.Lock()
+
+def _ensure_index():
+    global _index_loaded
+    if _index_loaded:
+        return
+    with _load_lock:
+        if not _index_loaded:
+            cursor = alerts_collection.find(
+                {"active": True},
+                {"user_id": 1, "symbol": 1, "condition": 1, "target_price": 1}
+            )
+            alert_index.load([_index_entry(alert) for alert in cursor])
+            _index_loaded = True
+            print(f"✅ Loaded {len(alert_index)} active price alerts")
+
+def _index_entry(alert):
+    return {
+        "_id": alert["_id"],
+        "user_id": alert["user_id"],
+        "symbol": alert["symbol"],
+        "condition": alert["condition"],
+        "target_price": float(alert["target_price"])
+    }
+
+def init_alert_service(socketio):
+    """Give the engine the Socket.IO server it emits price_alert events on"""
+    global _socketio
+    _socketio = socketio
+
+def create_alert(user_id, symbol, target_price, condition="above"):
+    try:
+        symbol = (symbol or "").strip().upper()
+        target_price = float(target_price)
+        if not symbol or condition not in ALERT_CONDITIONS or target_price <= 0:
+            return None, False
+
+        _ensure_index()
+        alert = {
+            "user_id": ObjectId(user_id),
+            "symbol": symbol,
+            "condition": condition,
+            "target_price": target_price,
+            "active": True,
+            "created_at": datetime.utcnow()
+        }
+        result = alerts_collection.insert_one(alert)
+        alert_index.add(_index_entry(alert))
+        adjust_profile_stat(user_id, "alerts", 1)
+        return str(result.inserted_id), True
+    except Exception as e:
+        print(f"Error creating alert: {e}")
+        return None, False
+
+def get_user_alerts(user_id):
+    try:
+        alerts = list(alerts_collection.find({"user_id": ObjectId(user_id)}).sort("created_at", -1))
+        return alerts, True
+    except Exception as e:
+        return [], False
+
+def check_price(symbol, price):
+    """Fire every active alert on `symbol` crossed by `price`; returns the fired alerts"""
+    if price is None or price <= 0:
+        return []
+    _ensure_index()
+    fired = alert_index.pop_triggered(symbol.upper(), float(price))
+    if fired:
+        _trigger_alerts(fired, float(price))
+    return fired
+
+def check_prices(quotes):
+    """check_price for a batch of quote dicts (as returned by the stock service).
+
+    Only fresh live quotes are evaluated: a placeholder or stale price must
+    never fire (and so permanently deactivate) an alert.
+    """
+    fired = []
+    for quote in quotes:
+        if is_fresh_quote(quote):
+            fired.extend(check_price(quote["symbol"], quote.get("price")))
+    return fired
+
+def _trigger_alerts(fired, price):
+    now = datetime.utcnow()
+    alerts_collection.update_many(
+        {"_id": {"$in": [alert["_id"] for alert in fired]}, "active": True},
+        {"$set": {"active": False, "triggered_at": now, "triggered_price": price}}
+    )
+    deactivated = {}
+    for alert in fired:
+        user_id = str(alert["user_id"])
+        deactivated.setdefault(user_id, {"alerts": 0})["alerts"] -= 1
+        queue_notification(
+            user_id,
+            f"Price Alert: {alert['symbol']}",
+            f"{alert['symbol']} is {alert['condition']} ${alert['target_price']} (now ${price})",
+            "alert"
+        )
+        if _socketio is not None:
+            _socketio.emit('price_alert', {
+                "symbol": alert["symbol"],
+                "condition": alert["condition"],
+                "target_price": alert["target_price"],
+                "price": price
+            }, to=user_room(user_id))
+    adjust_profile_stats(deactivated)
+    print(f"🔔 Triggered {len(fired)} price alert(s) for {fired[0]['symbol']} at ${price}")
@@ -1,8 +1,83 @@
-import yfinance as yf
-import pandas as pd
+import os
 import numpy as np
-from datetime import datetime, timedelta
-import talib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from services import indicators
+from services.history_store import load_history, load_bars_from, load_many, refresh_history, last_bar
+from services.indicator_state import IndicatorState
+from utils.cache import TTLCache
+
+ANALYSIS_PERIOD = "6mo"
+
+# Indicator parameters the recommendation is computed with (part of the cache key)
+ANALYSIS_PARAMS = (("sma", 20, 50), ("rsi", 14), ("macd", 12, 26, 9))
+
+# Running indicator state per symbol; an evicted state is rebuilt from history
+indicator_states = TTLCache(max_entries=1000, ttl=24 * 60 * 60)
+
+# Finished analyses keyed by (symbol, params, last bar). The recommendation only
+# changes when a bar is added or the latest one is revised, so until then a
+# request is answered from here without touching history or indicators.
+analysis_cache = TTLCache(max_entries=2000, ttl=24 * 60 * 60)
+
+# Bulk analysis spreads the indicator pass over a process pool once the
+# universe is at least this large. 0 workers keeps everything in-process.
+ANALYSIS_PROCESS_WORKERS = int(os.environ.get('ANALYSIS_PROCESS_WORKERS', '0'))
+ANALYSIS_PROCESS_MIN_SYMBOLS = int(os.environ.get('ANALYSIS_PROCESS_MIN_SYMBOLS', '500'))
+
+# Scoring rules: (points, reasoning) per outcome, in the order they are tested
+MA_RULES = (
+    (10, "✅ Strong uptrend: Price above MA20 and MA20 above MA50"),
+    (5, "↗️ Mild uptrend: Price above MA20"),
+    (-10, "❌ Strong downtrend: Price below MA20 and MA20 below MA50"),
+    (-5, "↘️ Mild downtrend: Price below MA20"),
+    (0, "➡️ Neutral: Price near moving averages"),
+)
+RSI_RULES = (
+    (10, "📈 Oversold: RSI below 30 (potential buying opportunity)"),
+    (5, "👍 Bullish: RSI in lower range"),
+    (-10, "📉 Overbought: RSI above 70 (potential selling pressure)"),
+    (-5, "👎 Bearish: RSI in higher range"),
+    (0, "⚖️ Neutral: RSI in normal range (30-70)"),
+)
+MACD_RULES = (
+    (10, "🚀 Strong bullish: MACD above signal line and positive"),
+    (5, "📊 Bullish: MACD above signal line"),
+    (-10, "🔻 Strong bearish: MACD below signal line and negative"),
+    (-5, "📉 Bearish: MACD below signal line"),
+    (0, "⚡ Neutral: MACD near signal line"),
+)
+RECOMMENDATIONS = (
+    ("STRONG BUY", "high"),
+    ("BUY", "medium"),
+    ("HOLD", "neutral"),
+    ("SELL", "medium"),
+    ("STRONG SELL", "high"),
+)
+
+def get_indicator_snapshot(symbol):
+    """Current MA/RSI/MACD values for a symbol.
+
+    The first call seeds an IndicatorState from the stored history; later calls
+    only feed it the bars that arrived since, so the full series is not re-read.
+    """
+    symbol = symbol.upper()
+    state = indicator_states.get(symbol)
+
+    if state is None:
+        hist = load_history(symbol, ANALYSIS_PERIOD)
+        if hist.empty:
+            return None
+        state = IndicatorState()
+        state.update_many(hist.index.asi8, hist['Close'].to_numpy())
+        indicator_states.set(symbol, state)
+        return state.snapshot()
+
+    refresh_history(symbol, ANALYSIS_PERIOD)
+    with state.lock:
+        new_bars = load_bars_from(symbol, ANALYSIS_PERIOD, state.last_timestamp)
+        state.update_many(new_bars.index.asi8, new_bars['Close'].to_numpy())
+        return state.snapshot()
 
 def calculate_technical_indicators(symbol):
     """
@@ -10,142 +85,117 @@ def calculate_technical_indicators(symbol):
     Returns: BUY/HOLD/SELL recommendation with score and reasoning
     """
     try:
-        # Fetch historical data
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period="6mo")
-        
-        if hist.empty:
+        latest = last_bar(symbol, ANALYSIS_PERIOD)
+        cache_key = (symbol.upper(), ANALYSIS_PARAMS, latest)
+        if latest is not None:
+            cached = analysis_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        snapshot = get_indicator_snapshot(symbol)
+
+        if snapshot is None or snapshot["price"] is None:
             return get_fallback_recommendation(symbol)
-        
-        # Calculate indicators
-        prices = hist['Close']
-        
-        # Moving Averages
-        ma20 = talib.SMA(prices, timeperiod=20)
-        ma50 = talib.SMA(prices, timeperiod=50)
-        
-        # RSI
-        rsi = talib.RSI(prices, timeperiod=14)
-        
-        # MACD
-        macd, macd_signal, macd_hist = talib.MACD(prices)
-        
-        # Get current values (most recent)
-        current_price = prices.iloc[-1]
-        current_ma20 = ma20.iloc[-1] if not pd.isna(ma20.iloc[-1]) else current_price
-        current_ma50 = ma50.iloc[-1] if not pd.isna(ma50.iloc[-1]) else current_price
-        current_rsi = rsi.iloc[-1] if not pd.isna(rsi.iloc[-1]) else 50
-        current_macd = macd.iloc[-1] if not pd.isna(macd.iloc[-1]) else 0
-        current_macd_signal = macd_signal.iloc[-1] if not pd.isna(macd_signal.iloc[-1]) else 0
-        
-        # Calculate scores for each indicator
-        score = 0
-        reasoning = []
-        
-        # 1. Moving Average Analysis (40% weight)
-        ma_score = 0
-        if current_price > current_ma20 and current_ma20 > current_ma50:
-            ma_score = 10
-            reasoning.append("✅ Strong uptrend: Price above MA20 and MA20 above MA50")
-        elif current_price > current_ma20:
-            ma_score = 5
-            reasoning.append("↗️ Mild uptrend: Price above MA20")
-        elif current_price < current_ma20 and current_ma20 < current_ma50:
-            ma_score = -10
-            reasoning.append("❌ Strong downtrend: Price below MA20 and MA20 below MA50")
-        elif current_price < current_ma20:
-            ma_score = -5
-            reasoning.append("↘️ Mild downtrend: Price below MA20")
-        else:
-            reasoning.append("➡️ Neutral: Price near moving averages")
-        
-        score += ma_score * 0.4
-        
-        # 2. RSI Analysis (30% weight)
-        rsi_score = 0
-        if current_rsi < 30:
-            rsi_score = 10
-            reasoning.append("📈 Oversold: RSI below 30 (potential buying opportunity)")
-        elif current_rsi < 45:
-            rsi_score = 5
-            reasoning.append("👍 Bullish: RSI in lower range")
-        elif current_rsi > 70:
-            rsi_score = -10
-            reasoning.append("📉 Overbought: RSI above 70 (potential selling pressure)")
-        elif current_rsi > 55:
-            rsi_score = -5
-            reasoning.append("👎 Bearish: RSI in higher range")
-        else:
-            reasoning.append("⚖️ Neutral: RSI in normal range (30-70)")
-        
-        score += rsi_score * 0.3
-        
-        # 3. MACD Analysis (30% weight)
-        macd_score = 0
-        if current_macd > current_macd_signal and current_macd > 0:
-            macd_score = 10
-            reasoning.append("🚀 Strong bullish: MACD above signal line and positive")
-        elif current_macd > current_macd_signal:
-            macd_score = 5
-            reasoning.append("📊 Bullish: MACD above signal line")
-        elif current_macd < current_macd_signal and current_macd < 0:
-            macd_score = -10
-            reasoning.append("🔻 Strong bearish: MACD below signal line and negative")
-        elif current_macd < current_macd_signal:
-            macd_score = -5
-            reasoning.append("📉 Bearish: MACD below signal line")
-        else:
-            reasoning.append("⚡ Neutral: MACD near signal line")
-        
-        score += macd_score * 0.3
-        
-        # Determine recommendation
-        if score >= 7:
-            recommendation = "STRONG BUY"
-            confidence = "high"
-        elif score >= 3:
-            recommendation = "BUY"
-            confidence = "medium"
-        elif score >= -2:
-            recommendation = "HOLD"
-            confidence = "neutral"
-        elif score >= -6:
-            recommendation = "SELL"
-            confidence = "medium"
-        else:
-            recommendation = "STRONG SELL"
-            confidence = "high"
-        
-        # Calculate additional metrics
-        price_change_1d = ((current_price - prices.iloc[-2]) / prices.iloc[-2]) * 100 if len(prices) > 1 else 0
-        price_change_1w = ((current_price - prices.iloc[-5]) / prices.iloc[-5]) * 100 if len(prices) > 5 else 0
-        
-        analysis_data = {
+
+        def value(v):
+            return np.array([np.nan if v is None else v], dtype=float)
+
+        analysis = build_analyses(
+            [symbol],
+            value(snapshot["price"]),
+            value(snapshot["moving_averages"][20]),
+            value(snapshot["moving_averages"][50]),
+            value(snapshot["rsi"]),
+            value(snapshot["macd"]),
+            value(snapshot["macd_signal"]),
+            value(snapshot["previous_close"]),
+            value(snapshot["week_ago_close"])
+        )[0]
+        if latest is not None:
+            analysis_cache.set(cache_key, analysis)
+        return analysis
+
+    except Exception as e:
+        print(f"Error in technical analysis for {symbol}: {e}")
+        return get_fallback_recommendation(symbol)
+
+def get_analysis_cache_stats():
+    """Hit/miss counters and hit rate of the analysis result cache"""
+    return analysis_cache.stats()
+
+def build_analyses(symbols, price, ma20, ma50, rsi, macd, macd_signal, previous_close, week_ago_close):
+    """Apply the MA/RSI/MACD scoring rules to equal-length arrays (one entry per symbol).
+
+    Missing indicator values (NaN) fall back to neutral inputs: the price for
+    the moving averages, 50 for RSI and 0 for MACD.
+    """
+    ma20 = np.where(np.isnan(ma20), price, ma20)
+    ma50 = np.where(np.isnan(ma50), price, ma50)
+    rsi = np.where(np.isnan(rsi), 50.0, rsi)
+    macd = np.where(np.isnan(macd), 0.0, macd)
+    macd_signal = np.where(np.isnan(macd_signal), 0.0, macd_signal)
+
+    # 1. Moving Average Analysis (40% weight)
+    ma_rule = np.select([
+        (price > ma20) & (ma20 > ma50),
+        price > ma20,
+        (price < ma20) & (ma20 < ma50),
+        price < ma20
+    ], [0, 1, 2, 3], 4)
+
+    # 2. RSI Analysis (30% weight)
+    rsi_rule = np.select([rsi < 30, rsi < 45, rsi > 70, rsi > 55], [0, 1, 2, 3], 4)
+
+    # 3. MACD Analysis (30% weight)
+    macd_rule = np.select([
+        (macd > macd_signal) & (macd > 0),
+        macd > macd_signal,
+        (macd < macd_signal) & (macd < 0),
+        macd < macd_signal
+    ], [0, 1, 2, 3], 4)
+
+    def points(rules, chosen):
+        return np.array([rule[0] for rule in rules], dtype=float)[chosen]
+
+    score = points(MA_RULES, ma_rule) * 0.4 + points(RSI_RULES, rsi_rule) * 0.3 + points(MACD_RULES, macd_rule) * 0.3
+
+    # Determine recommendation
+    recommendation_rule = np.select([score >= 7, score >= 3, score >= -2, score >= -6], [0, 1, 2, 3], 4)
+
+    # Calculate additional metrics
+    with np.errstate(invalid="ignore", divide="ignore"):
+        price_change_1d = np.nan_to_num((price - previous_close) / previous_close * 100, nan=0.0, posinf=0.0, neginf=0.0)
+        price_change_1w = np.nan_to_num((price - week_ago_close) / week_ago_close * 100, nan=0.0, posinf=0.0, neginf=0.0)
+
+    last_updated = datetime.now().isoformat()
+    analyses = []
+    for i, symbol in enumerate(symbols):
+        recommendation, confidence = RECOMMENDATIONS[recommendation_rule[i]]
+        analyses.append({
             "symbol": symbol.upper(),
             "recommendation": recommendation,
             "confidence": confidence,
-            "score": round(score, 2),
-            "current_price": round(current_price, 2),
+            "score": round(float(score[i]), 2),
+            "current_price": round(float(price[i]), 2),
             "indicators": {
-                "ma20": round(current_ma20, 2),
-                "ma50": round(current_ma50, 2),
-                "rsi": round(current_rsi, 2),
-                "macd": round(current_macd, 4),
-                "macd_signal": round(current_macd_signal, 4)
+                "ma20": round(float(ma20[i]), 2),
+                "ma50": round(float(ma50[i]), 2),
+                "rsi": round(float(rsi[i]), 2),
+                "macd": round(float(macd[i]), 4),
+                "macd_signal": round(float(macd_signal[i]), 4)
             },
             "price_changes": {
-                "1d": round(price_change_1d, 2),
-                "1w": round(price_change_1w, 2)
+                "1d": round(float(price_change_1d[i]), 2),
+                "1w": round(float(price_change_1w[i]), 2)
             },
-            "reasoning": reasoning,
-            "last_updated": datetime.now().isoformat()
-        }
-        
-        return analysis_data
-        
-    except Exception as e:
-        print(f"Error in technical analysis for {symbol}: {e}")
-        return get_fallback_recommendation(symbol)
+            "reasoning": [
+                MA_RULES[ma_rule[i]][1],
+                RSI_RULES[rsi_rule[i]][1],
+                MACD_RULES[macd_rule[i]][1]
+            ],
+            "last_updated": last_updated
+        })
+    return analyses
 
 def get_fallback_recommendation(symbol):
     """Fallback analysis when real data is unavailable"""
@@ -173,10 +223,67 @@ def get_fallback_recommendation(symbol):
         "last_updated": datetime.now().isoformat()
     }
 
+def latest_indicator_values(closes):
+    """Indicator values at the last bar for a (symbols x bars) close matrix.
+
+    Module-level so it can be shipped to worker processes.
+    """
+    macd, macd_signal, _ = indicators.macd(closes)
+    bars = closes.shape[1]
+    return {
+        "price": closes[:, -1],
+        "ma20": indicators.sma(closes, 20)[:, -1],
+        "ma50": indicators.sma(closes, 50)[:, -1],
+        "rsi": indicators.rsi(closes, 14)[:, -1],
+        "macd": macd[:, -1],
+        "macd_signal": macd_signal[:, -1],
+        "previous_close": closes[:, -2] if bars > 1 else np.full(len(closes), np.nan),
+        "week_ago_close": closes[:, -5] if bars >= 5 else np.full(len(closes), np.nan)
+    }
+
 def analyze_multiple_stocks(symbols):
-    """Analyze multiple stocks at once"""
-    results = []
-    for symbol in symbols:
-        analysis = calculate_technical_indicators(symbol)
-        results.append(analysis)
-    return results
\ No newline at end of file
+    """Analyze multiple stocks at once.
+
+    Histories are loaded together and scored in vectorized passes. Each row
+    of a close matrix holds only that symbol's own bars (symbols are grouped
+    by bar count, never aligned on a shared calendar), so every analysis
+    matches the single-symbol one and can share its cache entry. Results
+    keep the request order.
+    """
+    try:
+        frames = {symbol: frame for symbol, frame in load_many(symbols, ANALYSIS_PERIOD).items() if not frame.empty}
+    except Exception as e:
+        print(f"Error loading histories for bulk analysis: {e}")
+        frames = {}
+
+    analyses = {}
+    cache_keys = {}
+    for symbol, frame in frames.items():
+        close = frame['Close']
+        cache_keys[symbol] = (symbol, ANALYSIS_PARAMS, (int(close.index[-1].value), float(close.iloc[-1])))
+        cached = analysis_cache.get(cache_keys[symbol])
+        if cached is not None:
+            analyses[symbol] = cached
+
+    groups = {}
+    for symbol in frames:
+        if symbol not in analyses:
+            groups.setdefault(len(frames[symbol]), []).append(symbol)
+
+    for group in groups.values():
+        matrix = np.vstack([frames[symbol]['Close'].to_numpy(dtype=float) for symbol in group])
+        values = _latest_indicator_values_parallel(matrix)
+        for symbol, analysis in zip(group, build_analyses(group, **values)):
+            analysis_cache.set(cache_keys[symbol], analysis)
+            analyses[symbol] = analysis
+
+    return [analyses.get(symbol.upper()) or get_fallback_recommendation(symbol) for symbol in symbols]
+
+def _latest_indicator_values_parallel(matrix):
+    if ANALYSIS_PROCESS_WORKERS < 2 or len(matrix) < ANALYSIS_PROCESS_MIN_SYMBOLS:
+        return latest_indicator_values(matrix)
+
+    chunks = np.array_split(matrix, ANALYSIS_PROCESS_WORKERS)
+    with ProcessPoolExecutor(max_workers=ANALYSIS_PROCESS_WORKERS) as executor:
+        parts = list(executor.map(latest_indicator_values, chunks))
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
@@ -1,13 +1,53 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import create_access_token
 from database import get_database
 from datetime import datetime
 from bson import ObjectId
+from utils.cache import TTLCache
+
+try:
+    from eventlet import patcher, tpool
+except ImportError:  # eventlet is only needed for the production worker
+    patcher = tpool = None
 
 db = get_database()
 users_collection = db.users
 bcrypt = Bcrypt()
 
+# bcrypt work factor for new hashes (existing hashes keep the cost they were made with)
+BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', '12'))
+# Hashes allowed to run at once; further logins wait without blocking other requests
+BCRYPT_MAX_CONCURRENCY = int(os.environ.get('BCRYPT_MAX_CONCURRENCY', '4'))
+
+_hash_slots = threading.BoundedSemaphore(BCRYPT_MAX_CONCURRENCY)
+_hash_pool = ThreadPoolExecutor(max_workers=BCRYPT_MAX_CONCURRENCY, thread_name_prefix="bcrypt")
+
+# Per-process cache of the identity loaded for each JWT (see get_user_by_id)
+IDENTITY_CACHE_TTL = 5 * 60
+IDENTITY_PROJECTION = {"username": 1, "email": 1}
+identity_cache = TTLCache(max_entries=10000, ttl=IDENTITY_CACHE_TTL)
+
+def _run_blocking(fn, *args):
+    """Run CPU-bound work (bcrypt) on a native thread, at most BCRYPT_MAX_CONCURRENCY at a time.
+
+    Under the eventlet worker the thread comes from eventlet's tpool, so the
+    hub keeps serving other greenlets (sockets, quotes) while a hash runs;
+    otherwise a small thread pool is used. bcrypt releases the GIL while hashing.
+    """
+    with _hash_slots:
+        if tpool is not None and patcher.is_monkey_patched('thread'):
+            return tpool.execute(fn, *args)
+        return _hash_pool.submit(fn, *args).result()
+
+def hash_password(password):
+    return _run_blocking(bcrypt.generate_password_hash, password, BCRYPT_LOG_ROUNDS).decode("utf-8")
+
+def check_password(password_hash, password):
+    return _run_blocking(bcrypt.check_password_hash, password_hash, password)
+
 def register_user(username, email, password):
     try:
         print(f"🔧 Registering user: {username}, {email}")
@@ -20,7 +60,7 @@ def register_user(username, email, password):
             return {"error": "Username already taken"}, False
 
         # Create new user
-        hashed_pw = bcrypt.generate_password_hash(password).decode("utf-8")
+        hashed_pw = hash_password(password)
         user_data = {
             "username": username,
             "email": email,
@@ -55,7 +95,7 @@ def login_user(email, password):
             return {"error": "Invalid email or password"}, False
 
         # Check password
-        password_valid = bcrypt.check_password_hash(user["password"], password)
+        password_valid = check_password(user["password"], password)
         if not password_valid:
             print("❌ Invalid password")
             return {"error": "Invalid email or password"}, False
@@ -75,8 +115,23 @@ def login_user(email, password):
         return {"error": f"Login failed: {str(e)}"}, False
 
 def get_user_by_id(user_id):
+    """Identity fields for a user id, served from identity_cache when possible.
+
+    Runs on every authenticated request (the JWT user lookup), so it projects
+    only what authorization needs and never loads the password hash.
+    """
     try:
-        return users_collection.find_one({"_id": ObjectId(user_id)})
+        user = identity_cache.get(user_id)
+        if user is None:
+            user = users_collection.find_one({"_id": ObjectId(user_id)}, IDENTITY_PROJECTION)
+            if user is None:
+                return None
+            identity_cache.set(user_id, user)
+        return dict(user)
     except Exception as e:
         print(f"💥 Error getting user by ID: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+def invalidate_user_identity(user_id):
+    """Drop a cached identity; call after changing a user's profile, email or password"""
+    identity_cache.delete(str(user_id))
@@ -0,0 +1,302 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from utils.singleflight import SingleFlight
+
+# Local per-symbol OHLCV store. Each (symbol, interval) pair is one .npy file
+# holding a structured array of bars, read back memory-mapped, plus a small
+# JSON sidecar. Only bars newer than the last stored one are downloaded.
+HISTORY_STORE_DIR = os.environ.get(
+    'HISTORY_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'history')
+)
+HISTORY_REFRESH_INTERVAL = 15 * 60  # seconds before asking yfinance for newer bars again
+# Relative close difference on an already stored bar that means yfinance has
+# re-adjusted the back-history (split or dividend) since it was stored
+HISTORY_REBASE_TOLERANCE = float(os.environ.get('HISTORY_REBASE_TOLERANCE', 1e-4))
+
+# period -> (bar interval, calendar days covered)
+PERIODS = {
+    "1mo": ("1d", 31),
+    "3mo": ("1d", 92),
+    "6mo": ("1d", 183),
+    "1y": ("1d", 366),
+    "5y": ("1wk", 5 * 366),
+}
+DEFAULT_PERIOD = "6mo"
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+BAR_DTYPE = np.dtype([("timestamp", "<i8")] + [(field, "<f8") for field in FIELDS])
+
+_refresh_flight = SingleFlight()
+
+# One lock per (symbol, interval): refresh_history and load_many use different
+# flight keys, so the same series can be refreshed by two flights at once and
+# each merge is a read-modify-write of its files
+_series_locks = {}
+_series_locks_guard = threading.Lock()
+
+def _series_lock(symbol, interval):
+    with _series_locks_guard:
+        return _series_locks.setdefault((symbol, interval), threading.Lock())
+
+# (symbol, interval) -> sidecar metadata plus the last bar, kept in memory so
+# freshness checks and last_bar() don't have to touch the disk
+_series_meta = {}
+
+def load_history(symbol, period=DEFAULT_PERIOD):
+    """Return OHLCV bars for `period` as a DataFrame shaped like Ticker.history().
+
+    The store is topped up from yfinance at most every HISTORY_REFRESH_INTERVAL
+    seconds; in between, repeat requests only read the local file.
+    """
+    symbol = symbol.upper()
+    interval, start = refresh_history(symbol, period)
+
+    bars, meta = _read(symbol, interval)
+    if bars is None:
+        return pd.DataFrame(columns=list(FIELDS))
+    return _to_frame(bars[np.searchsorted(bars["timestamp"], start.value):], meta)
+
+def refresh_history(symbol, period=DEFAULT_PERIOD):
+    """Make sure the stored series covers `period` and is recent; returns (interval, window start)"""
+    symbol = symbol.upper()
+    interval, days = PERIODS.get(period, PERIODS[DEFAULT_PERIOD])
+    start = pd.Timestamp.now(tz="UTC").normalize() - pd.Timedelta(days=days)
+
+    meta = _series_meta.get((symbol, interval))
+    if meta is None or not _is_current(meta, start.value):
+        _refresh_flight.do((symbol, interval), _refresh, symbol, interval, start.value)
+    return interval, start
+
+def last_bar(symbol, period=DEFAULT_PERIOD):
+    """(timestamp ns, close) of the newest stored bar after a refresh check, or None"""
+    symbol = symbol.upper()
+    interval, _ = refresh_history(symbol, period)
+    meta = _series_meta.get((symbol, interval))
+    if meta is None:
+        _read(symbol, interval)
+        meta = _series_meta.get((symbol, interval))
+    return (meta["last_timestamp"], meta["last_close"]) if meta else None
+
+def load_bars_from(symbol, period, timestamp):
+    """Return the stored bars at or after `timestamp` (ns since epoch) without refreshing.
+
+    Lets incremental consumers read just the tail of a long series.
+    """
+    symbol = symbol.upper()
+    interval, _ = PERIODS.get(period, PERIODS[DEFAULT_PERIOD])
+    bars, meta = _read(symbol, interval)
+    if bars is None:
+        return pd.DataFrame(columns=list(FIELDS))
+    return _to_frame(bars[np.searchsorted(bars["timestamp"], timestamp):], meta)
+
+def load_many(symbols, period=DEFAULT_PERIOD):
+    """Load several symbols at once, topping up the stale ones with a single bulk download.
+
+    Returns {symbol: DataFrame}; symbols without any data map to an empty frame.
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    interval, days = PERIODS.get(period, PERIODS[DEFAULT_PERIOD])
+    start = pd.Timestamp.now(tz="UTC").normalize() - pd.Timedelta(days=days)
+    _refresh_flight.do((interval,) + tuple(symbols), _refresh_many, symbols, interval, start.value)
+
+    frames = {}
+    for symbol in symbols:
+        bars, meta = _read(symbol, interval)
+        if bars is None:
+            frames[symbol] = pd.DataFrame(columns=list(FIELDS))
+        else:
+            frames[symbol] = _to_frame(bars[np.searchsorted(bars["timestamp"], start.value):], meta)
+    return frames
+
+def download_frames(symbols, **kwargs):
+    """One yf.download call for many symbols, split into {symbol: OHLCV frame}"""
+    try:
+        frame = yf.download(symbols, group_by="ticker", threads=True, progress=False, **kwargs)
+    except Exception as e:
+        print(f"Error in bulk download for {symbols}: {e}")
+        return {}
+
+    if frame is None or frame.empty:
+        return {}
+
+    frames = {}
+    for symbol in symbols:
+        if isinstance(frame.columns, pd.MultiIndex):
+            if symbol not in frame.columns.get_level_values(0):
+                continue
+            symbol_frame = frame[symbol]
+        elif len(symbols) == 1:
+            symbol_frame = frame
+        else:
+            continue
+
+        symbol_frame = symbol_frame.dropna(subset=["Close"])
+        if not symbol_frame.empty:
+            frames[symbol] = symbol_frame
+    return frames
+
+def _is_current(meta, start_ns):
+    """Stored series covers the window and was checked against yfinance recently"""
+    return meta["covered_from"] <= start_ns and time.time() - meta["last_checked"] < HISTORY_REFRESH_INTERVAL
+
+def _fetch_start(bars, meta, start_ns):
+    """Where an upstream fetch has to start from, or None if the stored series is current"""
+    if bars is None or meta["covered_from"] > start_ns:
+        return start_ns
+    if _is_current(meta, start_ns):
+        return None
+    # Re-fetch from the last complete stored bar: the newest one may have been
+    # partial, and the one before it lets _rebased() compare adjustment bases
+    return int(bars["timestamp"][max(len(bars) - 2, 0)])
+
+def _rebased(bars, new_bars):
+    """True when upstream closes for bars we already stored no longer match them.
+
+    yfinance adjusts the whole back-history after a split or dividend, so
+    splicing new bars onto the old ones would leave a permanent step.
+    """
+    # The newest stored bar may have been partial, so it is never compared
+    stored = bars[:-1]
+    _, stored_idx, new_idx = np.intersect1d(stored["timestamp"], new_bars["timestamp"],
+                                            assume_unique=True, return_indices=True)
+    if not len(stored_idx):
+        return False
+    return not np.allclose(new_bars["Close"][new_idx], stored["Close"][stored_idx],
+                           rtol=HISTORY_REBASE_TOLERANCE, atol=0)
+
+def _same_basis(symbol, interval, start_ns, bars, meta, hist):
+    """(bars, meta, hist) to merge: the whole covered window, re-downloaded, when upstream re-adjusted it"""
+    if bars is None or hist is None or hist.empty or not _rebased(bars, _to_bars(hist)):
+        return bars, meta, hist
+
+    print(f"🔄 {symbol} {interval} history was re-adjusted upstream, re-downloading the stored window")
+    try:
+        hist = yf.Ticker(symbol).history(start=_as_date(min(start_ns, meta["covered_from"])), interval=interval)
+    except Exception as e:
+        print(f"Error re-downloading stored history for {symbol}: {e}")
+        # Keep the stored bars as they are rather than splice two bases; retried on the next refresh
+        return bars, meta, None
+    return None, None, hist
+
+def _refresh(symbol, interval, start_ns):
+    with _series_lock(symbol, interval):
+        bars, meta = _read(symbol, interval)
+        fetch_from = _fetch_start(bars, meta, start_ns)
+        if fetch_from is None:
+            return
+
+        try:
+            hist = yf.Ticker(symbol).history(start=_as_date(fetch_from), interval=interval)
+        except Exception as e:
+            print(f"Error refreshing stored history for {symbol}: {e}")
+            return
+
+        _merge(symbol, interval, start_ns, *_same_basis(symbol, interval, start_ns, bars, meta, hist))
+
+def _refresh_many(symbols, interval, start_ns):
+    stored = {symbol: _read(symbol, interval) for symbol in symbols}
+    fetch_from = {symbol: _fetch_start(*stored[symbol], start_ns) for symbol in symbols}
+    pending = [symbol for symbol in symbols if fetch_from[symbol] is not None]
+    if not pending:
+        return
+
+    # Same adjustment and timezone handling as Ticker.history, so bars merge cleanly
+    frames = download_frames(pending, start=_as_date(min(fetch_from[symbol] for symbol in pending)),
+                             interval=interval, auto_adjust=True, ignore_tz=False)
+    for symbol in pending:
+        # Re-read under the lock: another flight may have merged since the download started
+        with _series_lock(symbol, interval):
+            bars, meta = _read(symbol, interval)
+            _merge(symbol, interval, start_ns, *_same_basis(symbol, interval, start_ns, bars, meta, frames.get(symbol)))
+
+def _merge(symbol, interval, start_ns, bars, meta, hist):
+    now = time.time()
+    if hist is None or hist.empty:
+        if bars is not None:
+            _write(symbol, interval, bars, {**meta, "last_checked": now})
+        return
+
+    new_bars = _to_bars(hist)
+    if bars is not None and meta["covered_from"] <= start_ns:
+        keep = bars[:np.searchsorted(bars["timestamp"], new_bars["timestamp"][0])]
+        new_bars = np.concatenate([keep, new_bars])
+        covered_from = meta["covered_from"]
+    else:
+        covered_from = min(start_ns, int(new_bars["timestamp"][0]))
+
+    if meta is not None:
+        tz = meta["tz"]
+    else:
+        tz = str(hist.index.tz) if hist.index.tz is not None else "UTC"
+    _write(symbol, interval, new_bars, {"covered_from": covered_from, "last_checked": now, "tz": tz})
+
+def _as_date(timestamp_ns):
+    return pd.Timestamp(timestamp_ns, tz="UTC").strftime('%Y-%m-%d')
+
+def _to_bars(hist):
+    index = pd.DatetimeIndex(hist.index)
+    index = index.tz_convert("UTC") if index.tz is not None else index.tz_localize("UTC")
+    bars = np.empty(len(hist), dtype=BAR_DTYPE)
+    bars["timestamp"] = index.as_unit("ns").asi8
+    for field in FIELDS:
+        bars[field] = hist[field].to_numpy(dtype="f8")
+    return bars
+
+def _to_frame(bars, meta):
+    index = pd.DatetimeIndex(bars["timestamp"].astype("datetime64[ns]"), name="Date")
+    index = index.tz_localize("UTC").tz_convert(meta.get("tz", "UTC"))
+    return pd.DataFrame({field: bars[field] for field in FIELDS}, index=index)
+
+def _paths(symbol, interval):
+    directory = os.path.join(HISTORY_STORE_DIR, interval)
+    name = symbol.replace(os.sep, "_")
+    return os.path.join(directory, f"{name}.npy"), os.path.join(directory, f"{name}.json")
+
+def _read(symbol, interval):
+    bars_path, meta_path = _paths(symbol, interval)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        bars = np.load(bars_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None, None
+    _remember(symbol, interval, bars, meta)
+    return bars, meta
+
+def _remember(symbol, interval, bars, meta):
+    if len(bars):
+        _series_meta[(symbol, interval)] = {
+            **meta,
+            "last_timestamp": int(bars["timestamp"][-1]),
+            "last_close": float(bars["Close"][-1])
+        }
+
+def _write(symbol, interval, bars, meta):
+    """Write bars and metadata via temp files + os.replace so readers never see partial data"""
+    bars_path, meta_path = _paths(symbol, interval)
+    os.makedirs(os.path.dirname(bars_path), exist_ok=True)
+
+    _replace(bars_path, "wb", lambda f: np.save(f, np.ascontiguousarray(bars, dtype=BAR_DTYPE)))
+    _replace(meta_path, "w", lambda f: json.dump(meta, f))
+    _remember(symbol, interval, bars, meta)
+
+def _replace(path, mode, write):
+    """Write to a uniquely named temp file next to `path`, then atomically move it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,199 @@
+import copy
+import math
+import threading
+from collections import deque
+
+# Streaming versions of the indicators used for recommendations. Each update
+# costs O(1) and the results match the batch kernels in services.indicators:
+# EMAs and Wilder averages are seeded with the simple average of their first
+# `period` inputs, and a value is None until enough bars have been seen.
+
+class RollingMean:
+    """Simple moving average over a ring buffer with a running sum"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+
+    @property
+    def value(self):
+        return self.total / self.window if len(self.values) == self.window else None
+
+    def copy(self):
+        clone = copy.copy(self)
+        clone.values = deque(self.values, maxlen=self.window)
+        return clone
+
+class EMA:
+    """Exponential moving average seeded with the SMA of the first `period` inputs"""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = None
+
+    def update(self, x):
+        if self.value is not None:
+            self.value += self.alpha * (x - self.value)
+            return
+        self.count += 1
+        self.seed_total += x
+        if self.count == self.period:
+            self.value = self.seed_total / self.period
+
+    def copy(self):
+        return copy.copy(self)
+
+class WilderRSI:
+    """RSI using Wilder smoothing of average gains and losses"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.previous = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.value = None
+
+    def update(self, x):
+        if self.previous is None:
+            self.previous = x
+            return
+        change = x - self.previous
+        self.previous = x
+        gain = max(change, 0.0)
+        loss = max(-change, 0.0)
+
+        if self.count < self.period:
+            # Seed with the simple average of the first `period` changes
+            self.count += 1
+            self.avg_gain += gain / self.period
+            self.avg_loss += loss / self.period
+            if self.count < self.period:
+                return
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        total = self.avg_gain + self.avg_loss
+        self.value = 100.0 * self.avg_gain / total if total > 0 else 50.0
+
+    def copy(self):
+        return copy.copy(self)
+
+class MACD:
+    """MACD line (fast EMA - slow EMA) with an EMA signal line"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.value = None
+
+    def update(self, x):
+        self.fast.update(x)
+        self.slow.update(x)
+        if self.fast.value is None or self.slow.value is None:
+            return
+        self.value = self.fast.value - self.slow.value
+        self.signal.update(self.value)
+
+    def copy(self):
+        clone = copy.copy(self)
+        clone.fast = self.fast.copy()
+        clone.slow = self.slow.copy()
+        clone.signal = self.signal.copy()
+        return clone
+
+class IndicatorState:
+    """Running MA20/MA50/RSI/MACD state for one symbol.
+
+    update() takes bars in time order. A bar with the same timestamp as the
+    last one replaces it (the latest daily bar is revised intraday), which is
+    done by restoring a checkpoint taken before that bar was applied.
+    """
+
+    def __init__(self, ma_windows=(20, 50), rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9):
+        self.ma_windows = ma_windows
+        self.moving_averages = {window: RollingMean(window) for window in ma_windows}
+        self.rsi = WilderRSI(rsi_period)
+        self.macd = MACD(macd_fast, macd_slow, macd_signal)
+        self.recent_closes = deque(maxlen=5)
+        self.last_timestamp = None
+        self.bars = 0
+        self.lock = threading.Lock()
+        self._checkpoint = None
+
+    def update(self, timestamp, close, checkpoint=True):
+        close = float(close)
+        if math.isnan(close):
+            return
+        if self.last_timestamp is not None and timestamp < self.last_timestamp:
+            return
+        if timestamp == self.last_timestamp:
+            if self._checkpoint is None:
+                return
+            self._restore(self._checkpoint)
+
+        self._checkpoint = self._components() if checkpoint else None
+        self._apply(close)
+        self.last_timestamp = timestamp
+
+    def update_many(self, timestamps, closes):
+        """Apply a run of bars; only the last one is checkpointed for later revision"""
+        last = len(timestamps) - 1
+        for i, (timestamp, close) in enumerate(zip(timestamps, closes)):
+            self.update(timestamp, close, checkpoint=(i == last))
+
+    def preview(self, price):
+        """Snapshot as if `price` were the close of a new bar, without committing it"""
+        trial = copy.copy(self)
+        trial._restore(self._components())
+        trial._apply(float(price))
+        return trial.snapshot()
+
+    def _apply(self, close):
+        for average in self.moving_averages.values():
+            average.update(close)
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.recent_closes.append(close)
+        self.bars += 1
+
+    def snapshot(self):
+        closes = list(self.recent_closes)
+        return {
+            "price": closes[-1] if closes else None,
+            "previous_close": closes[-2] if len(closes) > 1 else None,
+            "week_ago_close": closes[0] if len(closes) == 5 else None,
+            "moving_averages": {window: average.value for window, average in self.moving_averages.items()},
+            "rsi": self.rsi.value,
+            "macd": self.macd.value,
+            "macd_signal": self.macd.signal.value,
+            "last_timestamp": self.last_timestamp,
+            "bars": self.bars
+        }
+
+    def _components(self):
+        """Independent copy of everything update() mutates (bounded by the largest window)"""
+        return (
+            {window: average.copy() for window, average in self.moving_averages.items()},
+            self.rsi.copy(),
+            self.macd.copy(),
+            deque(self.recent_closes, maxlen=self.recent_closes.maxlen),
+            self.last_timestamp,
+            self.bars
+        )
+
+    def _restore(self, components):
+        (self.moving_averages, self.rsi, self.macd,
+         self.recent_closes, self.last_timestamp, self.bars) = components
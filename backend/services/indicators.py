@@ -0,0 +1,97 @@
+import numpy as np
+
+# Vectorized indicator kernels shared by the stock and analysis services.
+#
+# Every function accepts a 1-D array (one series) or a 2-D array shaped
+# (symbols, bars) and returns arrays of the same shape. Values are NaN until
+# the indicator has enough data. Leading NaNs (e.g. a symbol that listed later
+# than the others in an aligned matrix) are skipped per row.
+#
+# Conventions match talib and services.indicator_state: EMAs and Wilder
+# averages are seeded with the simple average of their first `period` inputs,
+# and RSI uses Wilder smoothing. The one exception is MACD: talib seeds the
+# fast EMA over the slow EMA's first window, so early MACD values differ from
+# talib until the seed decays (checked by benchmarks/bench_indicators.py).
+
+def sma(values, window):
+    """Simple moving average over `window` bars"""
+    x, squeeze = _as_2d(values)
+    out = np.full(x.shape, np.nan)
+    if x.shape[1] >= window:
+        valid = ~np.isnan(x)
+        sums = np.zeros((x.shape[0], x.shape[1] + 1))
+        np.cumsum(np.where(valid, x, 0.0), axis=1, out=sums[:, 1:])
+        out[:, window - 1:] = (sums[:, window:] - sums[:, :-window]) / window
+        if not valid.all():
+            # Only windows made entirely of real values produce an average
+            counts = np.zeros(sums.shape, dtype=np.int64)
+            np.cumsum(valid, axis=1, out=counts[:, 1:])
+            out[:, window - 1:][counts[:, window:] - counts[:, :-window] < window] = np.nan
+    return out[0] if squeeze else out
+
+def ema(values, period):
+    """Exponential moving average seeded with the SMA of the first `period` values"""
+    x, squeeze = _as_2d(values)
+    out = _smooth(x, sma(x, period), 2.0 / (period + 1))
+    return out[0] if squeeze else out
+
+def rsi(values, period=14):
+    """Relative Strength Index with Wilder smoothing (0-100)"""
+    x, squeeze = _as_2d(values)
+    delta = np.full(x.shape, np.nan)
+    delta[:, 1:] = np.diff(x, axis=1)
+    gains = np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0))
+    losses = np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0.0))
+
+    avg_gain = _smooth(gains, sma(gains, period), 1.0 / period)
+    avg_loss = _smooth(losses, sma(losses, period), 1.0 / period)
+    total = avg_gain + avg_loss
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = np.where(total > 0, 100.0 * avg_gain / total, np.where(np.isnan(total), np.nan, 50.0))
+    return out[0] if squeeze else out
+
+def macd(values, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram"""
+    x, squeeze = _as_2d(values)
+    line = ema(x, fast) - ema(x, slow)
+    signal_line = ema(line, signal)
+    histogram = line - signal_line
+    if squeeze:
+        return line[0], signal_line[0], histogram[0]
+    return line, signal_line, histogram
+
+def _as_2d(values):
+    x = np.asarray(values, dtype=float)
+    return np.atleast_2d(x), x.ndim == 1
+
+def _smooth(x, seed, alpha):
+    """out[t] = out[t-1] + alpha * (x[t] - out[t-1]), starting at each row's first valid seed.
+
+    Instead of stepping bar by bar, the recursion is unrolled into
+    out[t] = decay**t * (carry + alpha * cumsum(x[k] * decay**-k)) over blocks
+    short enough that decay**-k stays far from overflowing. The seed enters as
+    an impulse of seed / alpha at each row's start bar.
+    """
+    rows, bars = x.shape
+    seeded = ~np.isnan(seed)
+    starts = np.where(seeded.any(axis=1), seeded.argmax(axis=1), bars)
+    bar_index = np.arange(bars)
+    at_start = bar_index == starts[:, None]
+    after_start = bar_index > starts[:, None]
+
+    impulses = np.where(after_start, x, 0.0)
+    impulses[at_start] = seed[at_start] / alpha
+
+    decay = 1.0 - alpha
+    block = max(1, int(300 / -np.log(decay)))  # keeps decay**-k below e**300
+    out = np.empty(x.shape)
+    carry = np.zeros(rows)
+    for begin in range(0, bars, block):
+        chunk = impulses[:, begin:begin + block]
+        k = np.arange(chunk.shape[1])
+        weighted = np.cumsum(chunk * decay ** -k, axis=1)
+        out[:, begin:begin + chunk.shape[1]] = decay ** k * (decay * carry[:, None] + alpha * weighted)
+        carry = out[:, begin + chunk.shape[1] - 1]
+
+    out[bar_index < starts[:, None]] = np.nan
+    return out
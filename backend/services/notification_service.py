@@ -1,43 +1,143 @@
+import atexit
+import base64
+import os
+import threading
+import time
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 from database import get_database
 from bson import ObjectId
 from datetime import datetime
+from utils.cache import TTLCache
+from utils.touched import TouchedKeys
 
 db = get_database()
 notifications_collection = db.notifications
+counters_collection = db.notification_counters  # {_id: user_id, unread}
 
-def get_user_notifications(user_id, unread_only=False):
+# Unread counts served to the polling badge; dropped whenever the counter moves
+UNREAD_COUNT_CACHE_TTL = 60
+unread_count_cache = TTLCache(max_entries=10000, ttl=UNREAD_COUNT_CACHE_TTL)
+
+# Users whose counters moved (or should have) since the last scoped reconcile
+touched_counters = TouchedKeys()
+# Users per reconcile query, so a full sweep never holds every user at once
+RECONCILE_BATCH_SIZE = 500
+
+NOTIFICATION_PAGE_SIZE = 20
+MAX_NOTIFICATION_PAGE_SIZE = 100
+
+# Buffered writer: flush after this many notifications or this many seconds
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', '500'))
+NOTIFICATION_FLUSH_INTERVAL = float(os.environ.get('NOTIFICATION_FLUSH_INTERVAL', '0.5'))
+
+# Fields the notification UI renders (_id is always returned)
+NOTIFICATION_PROJECTION = {"title": 1, "message": 1, "type": 1, "read": 1, "created_at": 1, "priority": 1}
+
+def encode_cursor(notification):
+    """Opaque cursor pointing just after `notification` in (created_at, _id) order"""
+    key = f"{notification['created_at'].isoformat()}|{notification['_id']}"
+    return base64.urlsafe_b64encode(key.encode()).decode()
+
+def decode_cursor(cursor):
+    """(created_at, _id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        created_at, notification_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), ObjectId(notification_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def get_user_notifications(user_id, unread_only=False, limit=NOTIFICATION_PAGE_SIZE, cursor=None):
+    """One page of a user's notifications, newest first.
+
+    Keyset pagination on (created_at, _id): each page starts from the cursor
+    through the (user_id, [read,] created_at, _id) index, so its cost does not
+    depend on how many notifications the user has. Returns
+    (notifications, next_cursor, success); next_cursor is None on the last page.
+    """
     try:
         query = {"user_id": user_id}
         if unread_only:
             query["read"] = False
-            
-        notifications = list(notifications_collection.find(query).sort("created_at", -1))
+        if cursor:
+            created_at, notification_id = decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": notification_id}}
+            ]
+        
+        limit = max(1, min(int(limit), MAX_NOTIFICATION_PAGE_SIZE))
+        notifications = list(
+            notifications_collection.find(query, NOTIFICATION_PROJECTION)
+            .sort([("created_at", -1), ("_id", -1)])
+            .limit(limit + 1)
+        )
+        
+        next_cursor = None
+        if len(notifications) > limit:
+            notifications = notifications[:limit]
+            next_cursor = encode_cursor(notifications[-1])
         
-        # Convert ObjectId to string for JSON serialization
-        for notification in notifications:
-            notification["_id"] = str(notification["_id"])
-            
-        return notifications, True
+        return notifications, next_cursor, True
+    except ValueError:
+        raise
     except Exception as e:
-        return [], False
+        return [], None, False
 
 def get_unread_notification_count(user_id):
+    """Unread count from the cache, else the user's counter document (one key lookup).
+
+    A user without a counter yet gets one backfilled from count_documents.
+    """
     try:
-        count = notifications_collection.count_documents({
-            "user_id": user_id,
-            "read": False
-        })
+        count = unread_count_cache.get(user_id)
+        if count is None:
+            counter = counters_collection.find_one({"_id": user_id})
+            if counter is None:
+                counter = counters_collection.find_one_and_update(
+                    {"_id": user_id},
+                    {"$setOnInsert": {"unread": notifications_collection.count_documents({
+                        "user_id": user_id,
+                        "read": False
+                    })}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            count = max(0, counter.get("unread", 0))
+            unread_count_cache.set(user_id, count)
         return count, True
     except Exception as e:
         return 0, False
 
+def _adjust_unread_counts(deltas):
+    """Apply {user_id: delta} to existing counters in one bulk write.
+
+    Counters are never created here (a missing one is backfilled on its first
+    read), so a delta can't start a counter that misses older notifications.
+    """
+    try:
+        operations = [UpdateOne({"_id": user_id}, {"$inc": {"unread": delta}}) for user_id, delta in deltas.items() if delta]
+        if operations:
+            counters_collection.bulk_write(operations, ordered=False)
+    except Exception as e:
+        print(f"❌ Failed to update unread counters: {e}")
+    finally:
+        touched_counters.update(deltas)
+        for user_id in deltas:
+            unread_count_cache.delete(user_id)
+
 def mark_notification_as_read(user_id, notification_id):
     try:
         result = notifications_collection.update_one(
-            {"_id": ObjectId(notification_id), "user_id": user_id},
+            {"_id": ObjectId(notification_id), "user_id": user_id, "read": False},
             {"$set": {"read": True, "read_at": datetime.utcnow()}}
         )
-        return result.modified_count > 0, True
+        if result.modified_count > 0:
+            _adjust_unread_counts({user_id: -1})
+            return True, True
+        # Already read still counts as success
+        exists = notifications_collection.count_documents({"_id": ObjectId(notification_id), "user_id": user_id}, limit=1)
+        return exists > 0, True
     except Exception as e:
         return False, False
 
@@ -47,22 +147,199 @@ def mark_all_notifications_as_read(user_id):
             {"user_id": user_id, "read": False},
             {"$set": {"read": True, "read_at": datetime.utcnow()}}
         )
+        _adjust_unread_counts({user_id: -result.modified_count})
         return result.modified_count, True
     except Exception as e:
         return 0, False
 
+def reconcile_unread_counters(user_ids=None):
+    """Reset stored counters that drifted from the real unread count; returns a summary.
+
+    With `user_ids` only those users are checked (the scheduled job passes the
+    users touched since its last run); with None every user that has a
+    counter is, RECONCILE_BATCH_SIZE at a time. Either way the unread counts
+    come from the (user_id, read, ...) index, never a scan of all notifications.
+    """
+    started = time.monotonic()
+    if user_ids is None:
+        user_ids = [counter["_id"] for counter in counters_collection.find({}, {"_id": 1})]
+    user_ids = list(user_ids)
+
+    corrected = 0
+    for begin in range(0, len(user_ids), RECONCILE_BATCH_SIZE):
+        corrected += _reconcile_counter_batch(user_ids[begin:begin + RECONCILE_BATCH_SIZE])
+    return {
+        "users_checked": len(user_ids),
+        "corrected": corrected,
+        "duration_ms": round((time.monotonic() - started) * 1000, 1)
+    }
+
+def _reconcile_counter_batch(user_ids):
+    actual = {
+        row["_id"]: row["unread"]
+        for row in notifications_collection.aggregate([
+            {"$match": {"user_id": {"$in": user_ids}, "read": False}},
+            {"$group": {"_id": "$user_id", "unread": {"$sum": 1}}}
+        ])
+    }
+    # Users without a counter are skipped: theirs is backfilled on first read
+    drifted = {
+        counter["_id"]: actual.get(counter["_id"], 0)
+        for counter in counters_collection.find({"_id": {"$in": user_ids}}, {"unread": 1})
+        if counter.get("unread", 0) != actual.get(counter["_id"], 0)
+    }
+    if drifted:
+        counters_collection.bulk_write(
+            [UpdateOne({"_id": user_id}, {"$set": {"unread": unread}}) for user_id, unread in drifted.items()],
+            ordered=False
+        )
+        for user_id in drifted:
+            unread_count_cache.delete(user_id)
+    return len(drifted)
+
+def _notification_document(user_id, title, message, type):
+    return {
+        "user_id": user_id,
+        "title": title,
+        "message": message,
+        "type": type,
+        "read": False,
+        "created_at": datetime.utcnow()
+    }
+
 def create_notification(user_id, title, message, type="info"):
+    """Insert one notification right away (single-shot callers that need its id)"""
     try:
-        notification = {
-            "user_id": user_id,
-            "title": title,
-            "message": message,
-            "type": type,
-            "read": False,
-            "created_at": datetime.utcnow()
-        }
+        notification = _notification_document(user_id, title, message, type)
         
         result = notifications_collection.insert_one(notification)
+        _adjust_unread_counts({user_id: 1})
         return str(result.inserted_id), True
     except Exception as e:
-        return None, False
\ No newline at end of file
+        return None, False
+
+class NotificationWriter:
+    """Buffers notifications and writes them with insert_many(ordered=False).
+
+    A background thread flushes whenever `max_batch` notifications are waiting
+    or `flush_interval` seconds have passed, so a burst (e.g. one price move
+    triggering alerts for thousands of users) costs a few round trips instead
+    of one per notification. close() flushes whatever is left.
+    """
+
+    def __init__(self, collection, max_batch=500, flush_interval=0.5):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.flushes = 0
+        self.inserted = 0
+        self.failed = 0
+        self.max_batch_seen = 0
+        self.total_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.last_flush_ms = 0.0
+
+    def add(self, user_id, title, message, type="info"):
+        """Queue a notification; returns False once the writer is closed"""
+        with self._condition:
+            if self._closed:
+                return False
+            self._buffer.append(_notification_document(user_id, title, message, type))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="notification-writer", daemon=True)
+                self._thread.start()
+            if len(self._buffer) >= self.max_batch:
+                self._condition.notify()
+        return True
+
+    def flush(self):
+        """Write everything queued so far; returns the number of notifications inserted"""
+        with self._flush_lock:
+            with self._condition:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+
+            started = time.monotonic()
+            try:
+                inserted = len(self.collection.insert_many(batch, ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                # Counters of the affected users are left to the reconcile job (touched below)
+                inserted = e.details.get("nInserted", 0)
+                print(f"❌ Notification flush: {len(batch) - inserted} of {len(batch)} failed")
+            except Exception as e:
+                inserted = 0
+                print(f"❌ Notification flush failed: {e}")
+            elapsed_ms = (time.monotonic() - started) * 1000
+
+            if inserted < len(batch):
+                touched_counters.update(notification["user_id"] for notification in batch)
+            else:
+                deltas = {}
+                for notification in batch:
+                    deltas[notification["user_id"]] = deltas.get(notification["user_id"], 0) + 1
+                _adjust_unread_counts(deltas)
+
+            self.flushes += 1
+            self.inserted += inserted
+            self.failed += len(batch) - inserted
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.last_flush_ms = elapsed_ms
+            self.total_flush_ms += elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            return inserted
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or len(self._buffer) >= self.max_batch,
+                                         timeout=self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=10)
+        self.flush()
+
+    def stats(self):
+        with self._condition:
+            pending = len(self._buffer)
+        return {
+            "pending": pending,
+            "flushes": self.flushes,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "avg_batch_size": round(self.inserted / self.flushes, 1) if self.flushes else 0,
+            "max_batch_size": self.max_batch_seen,
+            "last_flush_ms": round(self.last_flush_ms, 1),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 1) if self.flushes else 0,
+            "max_flush_ms": round(self.max_flush_ms, 1)
+        }
+
+notification_writer = NotificationWriter(
+    notifications_collection,
+    max_batch=NOTIFICATION_BATCH_SIZE,
+    flush_interval=NOTIFICATION_FLUSH_INTERVAL
+)
+atexit.register(notification_writer.close)
+
+def queue_notification(user_id, title, message, type="info"):
+    """Buffered create_notification for bulk producers (alerts, background jobs)"""
+    return notification_writer.add(user_id, title, message, type)
+
+def get_notification_writer_stats():
+    """Flush latency, batch size and backlog of the buffered notification writer"""
+    return notification_writer.stats()
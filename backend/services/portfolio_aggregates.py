@@ -0,0 +1,152 @@
+import math
+import time
+from datetime import datetime
+from pymongo import ReturnDocument
+from database import get_database
+from utils.touched import TouchedKeys
+
+# One document per user in `portfolio_aggregates`, maintained by the holding
+# write paths so the portfolio read endpoints never rescan `portfolio`:
+#
+#   {_id: user_id, total_investment, holding_count,
+#    holdings: {<holding_id>: {symbol, name, quantity, average_price,
+#                              total_investment, purchase_date, notes, created_at}}}
+#
+# Holdings are keyed by id rather than symbol (symbols such as BRK.B contain
+# dots, which cannot be used in update paths). A user holds each symbol at most
+# once, so the map also gives the quantity per symbol. Totals change through
+# $inc in a single update, so concurrent writes never lose each other's deltas.
+#
+# The holding write and its delta are two writes. A delta that fails drops the
+# aggregate (the next read backfills it from holdings), deltas never create an
+# aggregate, and reconcile_portfolio_aggregates() (scheduled in
+# background_jobs.reconcile_jobs) repairs whatever a failure in between left:
+# every few minutes for the users written to since its last run, and in a
+# slower full sweep for anything a crashed process never got to record.
+
+HOLDING_FIELDS = ('symbol', 'name', 'quantity', 'average_price', 'total_investment',
+                  'purchase_date', 'notes', 'created_at')
+
+# Users with a holding write in flight or done since the last scoped reconcile
+touched_portfolios = TouchedKeys()
+# Users per reconcile query, so a full sweep never loads every holding at once
+RECONCILE_BATCH_SIZE = 500
+
+def _collection():
+    return get_database().portfolio_aggregates
+
+def _entry(holding):
+    return {field: holding.get(field) for field in HOLDING_FIELDS}
+
+def _build_aggregate(user_id):
+    holdings = list(get_database().portfolio.find({'user_id': user_id}))
+    return {
+        'total_investment': sum(holding.get('total_investment', 0) for holding in holdings),
+        'holding_count': len(holdings),
+        'holdings': {str(holding['_id']): _entry(holding) for holding in holdings},
+        'updated_at': datetime.utcnow()
+    }
+
+def rebuild_portfolio_aggregate(user_id):
+    """Recompute a user's aggregate from their holdings (repair)"""
+    aggregate = _build_aggregate(user_id)
+    _collection().replace_one({'_id': user_id}, aggregate, upsert=True)
+    return {'_id': user_id, **aggregate}
+
+def get_portfolio_aggregate(user_id):
+    """The user's aggregate, backfilled from their holdings the first time it is needed.
+
+    The backfill only inserts ($setOnInsert), so it cannot overwrite deltas
+    another request applied after a concurrent backfill.
+    """
+    aggregate = _collection().find_one({'_id': user_id})
+    if aggregate is None:
+        aggregate = _collection().find_one_and_update(
+            {'_id': user_id},
+            {'$setOnInsert': _build_aggregate(user_id)},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    return aggregate
+
+def ensure_portfolio_aggregate(user_id):
+    """Backfill before a write so the write's delta lands on complete totals"""
+    touched_portfolios.add(user_id)
+    get_portfolio_aggregate(user_id)
+
+def invalidate_portfolio_aggregate(user_id):
+    """Drop the aggregate so the next read rebuilds it from holdings"""
+    try:
+        _collection().delete_one({'_id': user_id})
+    except Exception as e:
+        print(f"❌ Failed to drop portfolio aggregate for {user_id} (reconcile job will repair it): {e}")
+
+def _apply(user_id, update):
+    touched_portfolios.add(user_id)
+    try:
+        _collection().update_one({'_id': user_id}, update)
+    except Exception as e:
+        print(f"❌ Failed to update portfolio aggregate for {user_id}: {e}")
+        invalidate_portfolio_aggregate(user_id)
+
+def record_holding_added(user_id, holding):
+    _apply(user_id, {
+        '$inc': {'total_investment': holding.get('total_investment', 0), 'holding_count': 1},
+        '$set': {f"holdings.{holding['_id']}": _entry(holding), 'updated_at': datetime.utcnow()}
+    })
+
+def record_holding_updated(user_id, before, after):
+    _apply(user_id, {
+        '$inc': {'total_investment': after.get('total_investment', 0) - before.get('total_investment', 0)},
+        '$set': {f"holdings.{before['_id']}": _entry(after), 'updated_at': datetime.utcnow()}
+    })
+
+def record_holding_removed(user_id, holding):
+    _apply(user_id, {
+        '$inc': {'total_investment': -holding.get('total_investment', 0), 'holding_count': -1},
+        '$unset': {f"holdings.{holding['_id']}": ""},
+        '$set': {'updated_at': datetime.utcnow()}
+    })
+
+def reconcile_portfolio_aggregates(user_ids=None):
+    """Rebuild stored aggregates that drifted from the user's holdings; returns a summary.
+
+    With `user_ids` only those users are checked (the scheduled job passes the
+    users touched since its last run); with None every stored aggregate is,
+    RECONCILE_BATCH_SIZE users at a time. Users without an aggregate are left
+    alone: theirs is backfilled on first read.
+    """
+    started = time.monotonic()
+    if user_ids is None:
+        user_ids = [aggregate['_id'] for aggregate in _collection().find({}, {'_id': 1})]
+    user_ids = list(user_ids)
+
+    corrected = 0
+    for begin in range(0, len(user_ids), RECONCILE_BATCH_SIZE):
+        corrected += _reconcile_aggregate_batch(user_ids[begin:begin + RECONCILE_BATCH_SIZE])
+    return {
+        "users_checked": len(user_ids),
+        "corrected": corrected,
+        "duration_ms": round((time.monotonic() - started) * 1000, 1)
+    }
+
+def _reconcile_aggregate_batch(user_ids):
+    expected = {}
+    holdings = get_database().portfolio.find({'user_id': {'$in': user_ids}},
+                                             {field: 1 for field in HOLDING_FIELDS + ('user_id',)})
+    for holding in holdings:
+        expected.setdefault(holding['user_id'], {})[str(holding['_id'])] = _entry(holding)
+
+    drifted = []
+    for aggregate in _collection().find({'_id': {'$in': user_ids}},
+                                        {'total_investment': 1, 'holding_count': 1, 'holdings': 1}):
+        holdings = expected.get(aggregate['_id'], {})
+        total = sum(entry.get('total_investment') or 0 for entry in holdings.values())
+        if (aggregate.get('holdings', {}) != holdings
+                or aggregate.get('holding_count') != len(holdings)
+                or not math.isclose(aggregate.get('total_investment', 0), total, abs_tol=1e-6)):
+            drifted.append(aggregate['_id'])
+
+    for user_id in drifted:
+        rebuild_portfolio_aggregate(user_id)
+    return len(drifted)
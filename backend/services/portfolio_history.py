@@ -0,0 +1,71 @@
+import numpy as np
+from services.history_store import load_many
+
+def portfolio_value_history(quantities, period="1y"):
+    """Historical value of a portfolio from its current quantities ({symbol: quantity}).
+
+    Close series of all holdings are aligned on date into one (dates x symbols)
+    matrix, forward-filled across missing sessions and multiplied by the
+    quantity vector, so value, change, return and drawdown series come out of
+    a single vectorized pass. A symbol contributes nothing before its first bar.
+    """
+    if not quantities:
+        return {"history": [], "summary": _summary(np.zeros(0), np.zeros(0))}
+
+    frames = {symbol: frame for symbol, frame in load_many(list(quantities), period).items() if not frame.empty}
+    if not frames:
+        return {"history": [], "summary": _summary(np.zeros(0), np.zeros(0))}
+
+    # Align on the union of session dates (exchange-local calendar days)
+    days = {symbol: frame.index.tz_localize(None).to_numpy().astype('datetime64[D]') for symbol, frame in frames.items()}
+    dates = np.unique(np.concatenate(list(days.values())))
+    closes = np.full((len(dates), len(frames)), np.nan)
+    for column, (symbol, frame) in enumerate(frames.items()):
+        closes[np.searchsorted(dates, days[symbol]), column] = frame['Close'].to_numpy(dtype=float)
+
+    # Forward-fill missing sessions: carry each column's last seen row index down
+    seen = np.where(np.isnan(closes), 0, np.arange(len(dates))[:, None])
+    closes = closes[np.maximum.accumulate(seen, axis=0), np.arange(len(frames))]
+
+    quantity = np.array([quantities.get(symbol, 0) for symbol in frames], dtype=float)
+    value = np.nan_to_num(closes) @ quantity
+
+    previous = np.concatenate(([value[0]], value[:-1]))
+    daily_change = value - previous
+    peak = np.maximum.accumulate(value)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily_return = np.where(previous > 0, daily_change / previous * 100, 0.0)
+        cumulative_return = np.where(value[0] > 0, (value / value[0] - 1) * 100, 0.0)
+        drawdown = np.where(peak > 0, (value / peak - 1) * 100, 0.0)
+
+    dates = np.datetime_as_string(dates, unit='D')
+    history = [
+        {
+            "date": date,
+            "value": v,
+            "daily_change": change,
+            "daily_return": daily,
+            "cumulative_return": cumulative,
+            "drawdown": dd
+        }
+        for date, v, change, daily, cumulative, dd in zip(
+            dates.tolist(),
+            np.round(value, 2).tolist(),
+            np.round(daily_change, 2).tolist(),
+            np.round(daily_return, 2).tolist(),
+            np.round(cumulative_return, 2).tolist(),
+            np.round(drawdown, 2).tolist()
+        )
+    ]
+    return {"history": history, "summary": _summary(value, drawdown)}
+
+def _summary(value, drawdown):
+    if len(value) == 0:
+        return {"start_value": 0, "end_value": 0, "total_return": 0, "max_drawdown": 0}
+    total_return = (value[-1] / value[0] - 1) * 100 if value[0] > 0 else 0
+    return {
+        "start_value": round(float(value[0]), 2),
+        "end_value": round(float(value[-1]), 2),
+        "total_return": round(float(total_return), 2),
+        "max_drawdown": round(float(drawdown.min()), 2)
+    }
@@ -0,0 +1,109 @@
+import os
+import re
+import threading
+from services.stock_service import get_multiple_stocks
+from services.alert_service import check_prices
+
+# Server-side price push over Socket.IO. Clients join one room per symbol
+# ("symbol:AAPL"); every PRICE_PUSH_INTERVAL seconds all subscribed symbols are
+# quoted once through the shared cache/batch path and each quote is broadcast
+# to its room, instead of every open tab polling every symbol over HTTP.
+PRICE_PUSH_INTERVAL = float(os.environ.get('PRICE_PUSH_INTERVAL', '5'))  # seconds
+PRICE_FEED_MAX_SYMBOLS = int(os.environ.get('PRICE_FEED_MAX_SYMBOLS', '50'))  # per connection
+
+# Ticker shapes yfinance knows: AAPL, BRK.B, VOD.L, ^GSPC, EURUSD=X, BTC-USD
+SYMBOL_PATTERN = re.compile(r"^\^?[A-Z0-9][A-Z0-9.=\-]{0,14}$")
+
+_subscriptions = {}  # sid -> set of symbols
+_last_pushed = {}  # symbol -> last price broadcast to its room
+_lock = threading.Lock()
+_socketio = None
+
+def room_for(symbol):
+    return f"symbol:{symbol.upper()}"
+
+def _normalize(symbols):
+    """Upper-cased, de-duplicated, well-formed symbols; anything else is dropped"""
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    if not isinstance(symbols, (list, tuple)):
+        return []
+    normalized = {s.strip().upper() for s in symbols if isinstance(s, str)}
+    return sorted(s for s in normalized if SYMBOL_PATTERN.match(s))
+
+def subscribe(sid, symbols):
+    """Record a client's subscriptions; returns the symbols whose rooms it should join.
+
+    A connection holds at most PRICE_FEED_MAX_SYMBOLS symbols; new symbols
+    past that are not subscribed (and not returned).
+    """
+    symbols = _normalize(symbols)
+    with _lock:
+        current = _subscriptions.setdefault(sid, set())
+        room = max(0, PRICE_FEED_MAX_SYMBOLS - len(current))
+        added = [s for s in symbols if s not in current][:room]
+        current.update(added)
+        return sorted(s for s in symbols if s in current)
+
+def unsubscribe(sid, symbols=None):
+    """Drop some (or, with symbols=None, all) of a client's subscriptions; returns the dropped symbols"""
+    with _lock:
+        current = _subscriptions.get(sid, set())
+        dropped = sorted(current if symbols is None else current & set(_normalize(symbols)))
+        current.difference_update(dropped)
+        if not current:
+            _subscriptions.pop(sid, None)
+        active = set().union(*_subscriptions.values()) if _subscriptions else set()
+        for symbol in dropped:
+            if symbol not in active:
+                _last_pushed.pop(symbol, None)
+    return dropped
+
+def subscribed_symbols():
+    with _lock:
+        return sorted(set().union(*_subscriptions.values())) if _subscriptions else []
+
+def get_price_feed_stats():
+    with _lock:
+        return {
+            "clients": len(_subscriptions),
+            "symbols": len(set().union(*_subscriptions.values())) if _subscriptions else 0,
+            "interval": PRICE_PUSH_INTERVAL
+        }
+
+def push_prices_once():
+    """Quote every subscribed symbol once, evaluate price alerts and broadcast changed prices to their rooms"""
+    symbols = subscribed_symbols()
+    if not symbols or _socketio is None:
+        return 0
+
+    quotes = get_multiple_stocks(symbols)
+    check_prices(quotes)
+
+    pushed = 0
+    for quote in quotes:
+        symbol = quote["symbol"]
+        with _lock:
+            if _last_pushed.get(symbol) == quote["price"]:
+                continue
+            _last_pushed[symbol] = quote["price"]
+        _socketio.emit('price_update', quote, to=room_for(symbol))
+        pushed += 1
+    return pushed
+
+def _run():
+    while True:
+        _socketio.sleep(PRICE_PUSH_INTERVAL)
+        try:
+            push_prices_once()
+        except Exception as e:
+            print(f"❌ Price feed push failed: {e}")
+
+def start_price_feed(socketio):
+    """Start the push loop once per process (as a Socket.IO background task)"""
+    global _socketio
+    if _socketio is not None:
+        return
+    _socketio = socketio
+    socketio.start_background_task(_run)
+    print(f"✅ Price feed started (every {PRICE_PUSH_INTERVAL}s)")
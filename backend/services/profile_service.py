@@ -1,5 +1,96 @@
 from database import get_database as get_db
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from services.auth_service import invalidate_user_identity
+from utils.cache import TTLCache
+
+# Per-process read-through cache of the user document behind the profile and
+# preferences pages. Writes go through find_one_and_update and put the new
+# document back (cache_user), or drop it (invalidate_profile).
+PROFILE_CACHE_TTL = 5 * 60
+PROFILE_PROJECTION = {'password': 0}
+profile_cache = TTLCache(max_entries=10000, ttl=PROFILE_CACHE_TTL)
+
+# Profile stats are counters on the user document ({stats: {watchlist, portfolio,
+# alerts}}), moved by the watchlist, portfolio and alert write paths instead of
+# being counted on every profile view.
+PROFILE_STATS = ('watchlist', 'portfolio', 'alerts')
+
+def _count_stats(user_id):
+    db = get_db()
+    watchlist = db.watchlist.find_one({'user_id': str(user_id)}, {'stocks.symbol': 1})
+    return {
+        'watchlist': len(watchlist.get('stocks', [])) if watchlist else 0,
+        'portfolio': db.portfolio.count_documents({'user_id': ObjectId(user_id)}),
+        'alerts': db.alerts.count_documents({'user_id': ObjectId(user_id), 'active': True})
+    }
+
+def get_cached_user(user_id):
+    """The user's document (without password) from the cache, else one key lookup.
+
+    A user without stats yet gets them backfilled from count_documents once;
+    the backfill only applies while `stats` is still missing, so it cannot
+    overwrite counters another request has started moving.
+    """
+    user_id = str(user_id)
+    user = profile_cache.get(user_id)
+    if user is None:
+        users = get_db().users
+        user = users.find_one({'_id': ObjectId(user_id)}, PROFILE_PROJECTION)
+        if user is None:
+            return None
+        if 'stats' not in user:
+            user = users.find_one_and_update(
+                {'_id': ObjectId(user_id), 'stats': {'$exists': False}},
+                {'$set': {'stats': _count_stats(user_id)}},
+                projection=PROFILE_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            ) or users.find_one({'_id': ObjectId(user_id)}, PROFILE_PROJECTION)
+        cache_user(user)
+    return user
+
+def cache_user(user):
+    """Write-through: cache the document an update returned"""
+    if user is None:
+        return
+    if 'stats' in user:
+        profile_cache.set(str(user['_id']), user)
+    else:
+        profile_cache.delete(str(user['_id']))
+
+def invalidate_profile(user_id):
+    profile_cache.delete(str(user_id))
+    invalidate_user_identity(user_id)
+
+def adjust_profile_stats(deltas):
+    """Apply {user_id: {stat: delta}} to existing stats in one bulk write.
+
+    Stats are never created here (missing ones are backfilled on the first
+    profile read), so a delta can't start a counter that misses older documents.
+    """
+    try:
+        operations = [
+            UpdateOne({'_id': ObjectId(user_id), 'stats': {'$exists': True}},
+                      {'$inc': {f'stats.{stat}': delta for stat, delta in changes.items() if delta}})
+            for user_id, changes in deltas.items() if any(changes.values())
+        ]
+        if operations:
+            get_db().users.bulk_write(operations, ordered=False)
+    except Exception as e:
+        print(f"❌ Failed to update profile stats: {e}")
+    finally:
+        for user_id in deltas:
+            profile_cache.delete(str(user_id))
+
+def adjust_profile_stat(user_id, stat, delta):
+    adjust_profile_stats({user_id: {stat: delta}})
+
+def rebuild_profile_stats(user_id):
+    """Recount a user's stats from their documents (repair)"""
+    stats = _count_stats(user_id)
+    get_db().users.update_one({'_id': ObjectId(user_id)}, {'$set': {'stats': stats}})
+    profile_cache.delete(str(user_id))
+    return stats
 
 def get_user_profile(user_id):
     try:
@@ -90,6 +181,7 @@ def update_user_profile(user_id, profile_data):
             {'_id': ObjectId(user_id)},
             {'$set': update_fields}
         )
+        invalidate_profile(user_id)
         
         # Get updated user data
         updated_user = users.find_one({'_id': ObjectId(user_id)})
@@ -206,6 +298,7 @@ def update_user_preferences(user_id, data):
             {'_id': ObjectId(user_id)},
             {'$set': {'preferences': valid_preferences}}
         )
+        invalidate_profile(user_id)
         
         return {
             'success': True,
@@ -1,26 +1,90 @@
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
-import time
 import numpy as np
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.cache import TTLCache, FRESH, STALE
+from utils.singleflight import SingleFlight
+from services.history_store import load_history, download_frames
+from services import indicators
 
-# Cache to avoid frequent API calls (simple in-memory cache)
-stock_cache = {}
 CACHE_DURATION = 60  # 1 minute cache
+STALE_CACHE_DURATION = 5 * 60  # serve the last quote for up to 5 more minutes while refreshing
+QUOTE_CACHE_MAX_ENTRIES = 2000
+
+# Cache to avoid frequent API calls (bounded, LRU-evicted)
+stock_cache = TTLCache(max_entries=QUOTE_CACHE_MAX_ENTRIES, ttl=CACHE_DURATION,
+                       stale_ttl=STALE_CACHE_DURATION)
+
+# Company metadata (name, sector, market cap) barely changes, so it is cached
+# much longer than quotes and fetched separately from the bulk price download
+PROFILE_CACHE_DURATION = 24 * 60 * 60  # 1 day cache
+profile_cache = TTLCache(max_entries=QUOTE_CACHE_MAX_ENTRIES, ttl=PROFILE_CACHE_DURATION)
+
+# Upper bound on concurrent upstream calls made for a single batch request
+MAX_QUOTE_WORKERS = 8
+
+# Concurrent cache misses for the same symbol (or the same batch) share one
+# upstream fetch instead of each calling yfinance
+quote_flight = SingleFlight()
+
+# Keys with a background refresh already scheduled
+_refreshing = set()
+_refreshing_lock = threading.Lock()
 
 def get_stock_data(symbol):
+    # Check cache first; a stale quote is served immediately and refreshed behind the scenes
+    cache_key = symbol.upper()
+    cached_data, state = stock_cache.lookup(cache_key)
+    if state == FRESH:
+        return cached_data
+    if state == STALE:
+        _refresh_in_background(cache_key, _fetch_stock_data, symbol)
+        return cached_data
+    
+    return quote_flight.do(cache_key, _fetch_stock_data, symbol)
+
+def _refresh_in_background(key, fn, *args):
+    """Run fn through quote_flight on a background thread, once per key at a time"""
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            quote_flight.do(key, fn, *args)
+        except Exception as e:
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def is_fresh_quote(quote):
+    """True for a live quote still within its cache freshness window.
+
+    Placeholder quotes (get_static_stock_data, is_real_time False) are never
+    cached, and a quote served stale or since replaced is no longer the
+    object the cache holds as fresh, so all of those are rejected.
+    """
+    if not quote or not quote.get("is_real_time"):
+        return False
+    cached, state = stock_cache.peek(quote["symbol"])
+    return state == FRESH and cached is quote
+
+def get_quote_cache_stats():
+    """Hit, miss, stale and eviction counters for the quote cache"""
+    return stock_cache.stats()
+
+def _fetch_stock_data(symbol):
     try:
-        # Check cache first
         cache_key = symbol.upper()
-        if cache_key in stock_cache:
-            cached_data, timestamp = stock_cache[cache_key]
-            if (datetime.now() - timestamp).seconds < CACHE_DURATION:
-                return cached_data
-        
         stock = yf.Ticker(symbol)
         info = stock.info
-        hist = stock.history(period="1d")
-        
+
         # Get fast info for real-time data
         fast_info = stock.fast_info
         
@@ -35,37 +99,18 @@ def get_stock_data(symbol):
                          info.get("regularMarketPreviousClose") or 
                          current_price)
         
-        if current_price and previous_close:
-            change = current_price - previous_close
-            change_percent = (change / previous_close) * 100
-        else:
-            change = 0
-            change_percent = 0
-
         # Get additional real-time data
         day_high = fast_info.get('day_high') or info.get("dayHigh") or 0
         day_low = fast_info.get('day_low') or info.get("dayLow") or 0
         volume = fast_info.get('last_volume') or info.get("volume") or 0
         
-        data = {
-            "symbol": symbol.upper(),
-            "name": info.get("shortName", symbol.upper()),
-            "price": round(current_price, 2) if current_price else 0,
-            "previous_close": round(previous_close, 2) if previous_close else 0,
-            "change": round(change, 2),
-            "change_percent": round(change_percent, 2),
-            "day_high": round(day_high, 2) if day_high else 0,
-            "day_low": round(day_low, 2) if day_low else 0,
-            "volume": int(volume) if volume else 0,
-            "market_cap": info.get("marketCap", 0),
-            "exchange": info.get("exchange", "N/A"),
-            "sector": info.get("sector", "N/A"),
-            "last_updated": datetime.now().isoformat(),
-            "is_real_time": True
-        }
+        profile = _profile_from_info(symbol, info)
+        profile_cache.set(cache_key, profile)
+        
+        data = _build_quote(symbol, profile, current_price, previous_close, day_high, day_low, volume)
         
         # Update cache
-        stock_cache[cache_key] = (data, datetime.now())
+        stock_cache.set(cache_key, data)
         return data
         
     except Exception as e:
@@ -107,95 +152,103 @@ def get_static_stock_data(symbol):
 
 def get_stock_history(symbol, period="6mo"):
     """Get historical data for charts with OHLC data"""
+    return history_records(get_stock_history_columns(symbol, period))
+
+def get_stock_history_columns(symbol, period="6mo"):
+    """get_stock_history() as one list per field (see history_columns)"""
     try:
-        stock = yf.Ticker(symbol)
-        
-        # Get data for different periods
-        if period == "1mo":
-            hist = stock.history(period="1mo", interval="1d")
-        elif period == "3mo":
-            hist = stock.history(period="3mo", interval="1d")
-        elif period == "6mo":
-            hist = stock.history(period="6mo", interval="1d")
-        elif period == "1y":
-            hist = stock.history(period="1y", interval="1d")
-        elif period == "5y":
-            hist = stock.history(period="5y", interval="1wk")
-        else:
-            hist = stock.history(period="6mo", interval="1d")
+        # Served from the local history store; only new bars are downloaded
+        hist = load_history(symbol, period)
         
         if hist.empty:
-            return generate_sample_history(symbol, period)
-        
-        # Reset index to get Date as column
-        hist = hist.reset_index()
+            return records_columns(generate_sample_history(symbol, period))
         
-        # Convert to list of dictionaries with proper formatting
-        history_data = []
-        for index, row in hist.iterrows():
-            # Calculate moving averages
-            sma_20 = hist['Close'].rolling(window=min(20, index+1)).mean().iloc[index] if index >= 19 else 0
-            sma_50 = hist['Close'].rolling(window=min(50, index+1)).mean().iloc[index] if index >= 49 else 0
-            
-            history_data.append({
-                "date": row['Date'].strftime('%Y-%m-%d'),
-                "timestamp": row['Date'].timestamp(),
-                "open": round(row['Open'], 2) if pd.notna(row['Open']) else 0,
-                "high": round(row['High'], 2) if pd.notna(row['High']) else 0,
-                "low": round(row['Low'], 2) if pd.notna(row['Low']) else 0,
-                "close": round(row['Close'], 2) if pd.notna(row['Close']) else 0,
-                "volume": int(row['Volume']) if pd.notna(row['Volume']) else 0,
-                "sma_20": round(sma_20, 2) if sma_20 else 0,
-                "sma_50": round(sma_50, 2) if sma_50 else 0
-            })
-        
-        return history_data
+        return history_columns(hist)
     except Exception as e:
         print(f"Error fetching history for {symbol}: {e}")
-        return generate_sample_history(symbol, period)
+        return records_columns(generate_sample_history(symbol, period))
+
+HISTORY_FIELDS = ("date", "timestamp", "open", "high", "low", "close", "volume", "sma_20", "sma_50")
+OHLC_FIELDS = HISTORY_FIELDS[:7]
+
+def history_columns(hist):
+    """Convert an OHLCV frame into one list per output field.
+
+    Everything is computed column-wise: SMA20/SMA50 use a single rolling pass,
+    prices are rounded to 2 decimals and missing values become 0.
+    """
+    index = pd.DatetimeIndex(hist.index)
+    utc_index = index.tz_convert("UTC") if index.tz is not None else index.tz_localize("UTC")
+    # Dates are taken from the exchange-local wall clock, like Timestamp.strftime
+    local_dates = np.datetime_as_string(index.tz_localize(None).to_numpy(), unit='D')
+    close = hist['Close']
+
+    def prices(series):
+        return series.round(2).fillna(0).tolist()
+
+    return {
+        "date": local_dates.tolist(),
+        "timestamp": ((utc_index - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)).tolist(),
+        "open": prices(hist['Open']),
+        "high": prices(hist['High']),
+        "low": prices(hist['Low']),
+        "close": prices(close),
+        "volume": hist['Volume'].fillna(0).astype('int64').tolist(),
+        "sma_20": prices(close.rolling(window=20).mean()),
+        "sma_50": prices(close.rolling(window=50).mean())
+    }
+
+def history_records(columns):
+    """Turn history_columns() output into the row-per-bar list the API returns"""
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*(columns[key] for key in keys))]
+
+def records_columns(records):
+    """Inverse of history_records()"""
+    keys = list(records[0]) if records else list(HISTORY_FIELDS)
+    return {key: [record[key] for record in records] for key in keys}
 
 def get_detailed_stock_history(symbol, period="6mo"):
     """Get detailed historical data including technical indicators"""
+    return history_records(get_detailed_stock_history_columns(symbol, period))
+
+def get_detailed_stock_history_columns(symbol, period="6mo"):
+    """get_detailed_stock_history() as one list per field"""
+    columns = get_stock_history_columns(symbol, period)
     try:
-        history_data = get_stock_history(symbol, period)
-        
         # Add technical indicators
-        df = pd.DataFrame(history_data)
+        close = pd.Series(columns['close'], dtype=float)
         
         # Calculate RSI
-        df['rsi'] = calculate_rsi(df['close'])
+        rsi = calculate_rsi(close)
         
         # Calculate MACD
-        macd, signal = calculate_macd(df['close'])
-        df['macd'] = macd
-        df['macd_signal'] = signal
-        df['macd_histogram'] = df['macd'] - df['macd_signal']
+        macd, signal = calculate_macd(close)
         
-        return df.to_dict('records')
+        return {
+            **columns,
+            'rsi': rsi.tolist(),
+            'macd': macd.tolist(),
+            'macd_signal': signal.tolist(),
+            'macd_histogram': (macd - signal).tolist()
+        }
     except Exception as e:
         print(f"Error in detailed history for {symbol}: {e}")
-        return history_data
+        return columns
 
 def calculate_rsi(prices, window=14):
-    """Calculate RSI manually"""
+    """Calculate RSI (Wilder smoothing, same as the analysis service)"""
     try:
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi.fillna(50)
+        values = indicators.rsi(prices.to_numpy(dtype=float), window)
+        return pd.Series(values, index=prices.index).fillna(50)
     except:
         return pd.Series([50] * len(prices))
 
 def calculate_macd(prices, fast=12, slow=26, signal=9):
-    """Calculate MACD manually"""
+    """Calculate MACD and its signal line; 0 until enough bars are available"""
     try:
-        ema_fast = prices.ewm(span=fast).mean()
-        ema_slow = prices.ewm(span=slow).mean()
-        macd = ema_fast - ema_slow
-        macd_signal = macd.ewm(span=signal).mean()
-        return macd, macd_signal
+        macd, macd_signal, _ = indicators.macd(prices.to_numpy(dtype=float), fast, slow, signal)
+        return pd.Series(macd, index=prices.index).fillna(0), pd.Series(macd_signal, index=prices.index).fillna(0)
     except:
         return pd.Series([0] * len(prices)), pd.Series([0] * len(prices))
 
@@ -252,11 +305,128 @@ def get_live_price(symbol):
         return get_static_stock_data(symbol)["price"] if get_static_stock_data(symbol) else 0
 
 def get_multiple_stocks(symbols):
-    """Fetch data for multiple stocks efficiently with parallel processing"""
-    results = []
-    for symbol in symbols:
-        data = get_stock_data(symbol)
-        if data:
-            results.append(data)
-        time.sleep(0.1)  # Small delay to avoid rate limiting
-    return results
\ No newline at end of file
+    """Fetch data for multiple stocks, batching cache misses into one bulk download.
+
+    Results are returned in request order (duplicates collapsed); symbols that
+    cannot be resolved at all are left out, as before.
+    """
+    ordered = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    results = {}
+    stale = []
+    misses = []
+
+    for symbol in ordered:
+        cached_data, state = stock_cache.lookup(symbol)
+        if state == FRESH:
+            results[symbol] = cached_data
+        elif state == STALE:
+            results[symbol] = cached_data
+            stale.append(symbol)
+        else:
+            misses.append(symbol)
+
+    if stale:
+        _refresh_in_background(("batch",) + tuple(stale), fetch_quotes_batch, stale)
+    if misses:
+        results.update(quote_flight.do(("batch",) + tuple(misses), fetch_quotes_batch, misses))
+
+    return [results[symbol] for symbol in ordered if results.get(symbol)]
+
+def get_current_prices(symbols):
+    """Latest price per symbol ({SYMBOL: price}) from one deduplicated, cached batch lookup.
+
+    Symbols that cannot be priced are left out; callers pick their own fallback.
+    """
+    return {quote["symbol"]: quote["price"] for quote in get_multiple_stocks(symbols) if quote.get("price")}
+
+def fetch_quotes_batch(symbols):
+    """Fetch fresh quotes for several symbols with one bulk price download.
+
+    Company metadata is resolved concurrently (bounded by MAX_QUOTE_WORKERS) and
+    cached for a day. Symbols missing from the bulk response fall back to the
+    single-symbol path. Every quote fetched here is written to stock_cache.
+    """
+    prices = _download_latest_bars(symbols)
+    quotes = {}
+
+    with ThreadPoolExecutor(max_workers=min(MAX_QUOTE_WORKERS, len(symbols))) as executor:
+        profiles = dict(zip(symbols, executor.map(get_stock_profile, symbols)))
+
+        fallback = [symbol for symbol in symbols if symbol not in prices]
+        for symbol, data in zip(fallback, executor.map(get_stock_data, fallback)):
+            quotes[symbol] = data
+
+    for symbol, bar in prices.items():
+        data = _build_quote(symbol, profiles.get(symbol) or {}, **bar)
+        stock_cache.set(symbol, data)
+        quotes[symbol] = data
+
+    return quotes
+
+def get_quote_fetch_stats():
+    """Upstream fetches vs. callers served by an already in-flight fetch"""
+    return quote_flight.stats()
+
+def get_stock_profile(symbol):
+    """Get slowly changing company metadata, cached for PROFILE_CACHE_DURATION"""
+    cache_key = symbol.upper()
+    profile = profile_cache.get(cache_key)
+    if profile is not None:
+        return profile
+
+    try:
+        profile = _profile_from_info(symbol, yf.Ticker(symbol).info)
+        profile_cache.set(cache_key, profile)
+        return profile
+    except Exception as e:
+        print(f"Error fetching profile for {symbol}: {e}")
+        return {}
+
+def _profile_from_info(symbol, info):
+    return {
+        "name": info.get("shortName", symbol.upper()),
+        "market_cap": info.get("marketCap", 0),
+        "exchange": info.get("exchange", "N/A"),
+        "sector": info.get("sector", "N/A")
+    }
+
+def _download_latest_bars(symbols):
+    """Download the last few daily bars for all symbols in a single request"""
+    bars = {}
+    for symbol, frame in download_frames(symbols, period="5d", interval="1d", auto_adjust=False).items():
+        last = frame.iloc[-1]
+        previous_close = frame["Close"].iloc[-2] if len(frame) > 1 else last["Close"]
+        bars[symbol] = {
+            "current_price": float(last["Close"]),
+            "previous_close": float(previous_close),
+            "day_high": float(last["High"]) if pd.notna(last["High"]) else 0,
+            "day_low": float(last["Low"]) if pd.notna(last["Low"]) else 0,
+            "volume": float(last["Volume"]) if pd.notna(last["Volume"]) else 0
+        }
+    return bars
+
+def _build_quote(symbol, profile, current_price, previous_close, day_high, day_low, volume):
+    """Build the quote payload returned by get_stock_data"""
+    if current_price and previous_close:
+        change = current_price - previous_close
+        change_percent = (change / previous_close) * 100
+    else:
+        change = 0
+        change_percent = 0
+
+    return {
+        "symbol": symbol.upper(),
+        "name": profile.get("name", symbol.upper()),
+        "price": round(current_price, 2) if current_price else 0,
+        "previous_close": round(previous_close, 2) if previous_close else 0,
+        "change": round(change, 2),
+        "change_percent": round(change_percent, 2),
+        "day_high": round(day_high, 2) if day_high else 0,
+        "day_low": round(day_low, 2) if day_low else 0,
+        "volume": int(volume) if volume else 0,
+        "market_cap": profile.get("market_cap", 0),
+        "exchange": profile.get("exchange", "N/A"),
+        "sector": profile.get("sector", "N/A"),
+        "last_updated": datetime.now().isoformat(),
+        "is_real_time": True
+    }
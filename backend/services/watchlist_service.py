@@ -1,47 +1,58 @@
 from database import get_database
-from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+from services.profile_service import adjust_profile_stat
 
 db = get_database()
 watchlist_collection = db.watchlist
 
 def get_user_watchlist(user_id):
     try:
-        watchlist = watchlist_collection.find_one({"user_id": user_id})
-        return watchlist["stocks"] if watchlist else []
+        watchlist = watchlist_collection.find_one({"user_id": user_id}, {"stocks": 1, "_id": 0})
+        return watchlist.get("stocks", []) if watchlist else []
     except Exception as e:
         print(f"Error getting watchlist: {e}")
         return []
 
+def is_in_watchlist(user_id, stock_symbol):
+    """Membership test answered by the (user_id, stocks.symbol) index"""
+    return watchlist_collection.count_documents(
+        {"user_id": user_id, "stocks.symbol": stock_symbol.upper()}, limit=1
+    ) > 0
+
 def add_to_watchlist(user_id, stock_symbol, stock_name):
+    """Add a stock in one round trip.
+
+    The push only matches a watchlist that doesn't hold the symbol yet, and
+    upserts the watchlist if the user has none. When the symbol is already
+    there, the upsert collides with the unique user_id index instead. A
+    collision can also come from a concurrent first add creating the
+    watchlist, so it is retried once before being reported as a duplicate.
+    An upsert that still produced a second watchlist for the user (the index
+    missing) is undone and retried the same way, so the existing one is used.
+    """
+    stock_data = {
+        "symbol": stock_symbol.upper(),
+        "name": stock_name,
+        "added_at": datetime.utcnow().isoformat()
+    }
+    
     try:
-        # Check if user has a watchlist
-        watchlist = watchlist_collection.find_one({"user_id": user_id})
-        
-        stock_data = {
-            "symbol": stock_symbol.upper(),
-            "name": stock_name,
-            "added_at": datetime.utcnow().isoformat()
-        }
-        
-        if watchlist:
-            # Check if stock already in watchlist
-            if any(stock["symbol"] == stock_symbol.upper() for stock in watchlist.get("stocks", [])):
-                return {"error": "Stock already in watchlist"}, False
-            
-            # Add to existing watchlist
-            watchlist_collection.update_one(
-                {"user_id": user_id},
-                {"$push": {"stocks": stock_data}}
-            )
-        else:
-            # Create new watchlist
-            watchlist_collection.insert_one({
-                "user_id": user_id,
-                "stocks": [stock_data]
-            })
-        
-        return {"message": f"{stock_symbol} added to watchlist"}, True
+        for attempt in range(2):
+            try:
+                result = watchlist_collection.update_one(
+                    {"user_id": user_id, "stocks.symbol": {"$ne": stock_data["symbol"]}},
+                    {"$push": {"stocks": stock_data}},
+                    upsert=True
+                )
+                if result.upserted_id is not None and watchlist_collection.count_documents({"user_id": user_id}, limit=2) > 1:
+                    watchlist_collection.delete_one({"_id": result.upserted_id})
+                    continue
+                adjust_profile_stat(user_id, "watchlist", 1)
+                return {"message": f"{stock_symbol} added to watchlist"}, True
+            except DuplicateKeyError:
+                continue
+        return {"error": "Stock already in watchlist"}, False
         
     except Exception as e:
         return {"error": f"Failed to add to watchlist: {str(e)}"}, False
@@ -54,6 +65,7 @@ def remove_from_watchlist(user_id, stock_symbol):
         )
         
         if result.modified_count > 0:
+            adjust_profile_stat(user_id, "watchlist", -1)
             return {"message": f"{stock_symbol} removed from watchlist"}, True
         else:
             return {"error": "Stock not found in watchlist"}, False
@@ -0,0 +1,78 @@
+import types
+import numpy as np
+import pandas as pd
+import pytest
+from services import history_store
+
+class FakeUpstream:
+    """Stands in for yfinance: serves `frame` from the requested start date on"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.starts = []
+
+    def history(self, start, interval):
+        self.starts.append(start)
+        return self.frame[self.frame.index >= pd.Timestamp(start, tz=self.frame.index.tz)]
+
+    def module(self):
+        return types.SimpleNamespace(Ticker=lambda symbol: self)
+
+def daily_bars(closes, end):
+    index = pd.bdate_range(end=end, periods=len(closes), tz="America/New_York", name="Date")
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({"Open": closes, "High": closes, "Low": closes, "Close": closes,
+                         "Volume": np.full(len(closes), 1000.0)}, index=index)
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    fake = FakeUpstream(None)
+    monkeypatch.setattr(history_store, "yf", fake.module())
+    monkeypatch.setattr(history_store, "HISTORY_STORE_DIR", str(tmp_path))
+    # Every call checks upstream again instead of trusting the stored series
+    monkeypatch.setattr(history_store, "HISTORY_REFRESH_INTERVAL", 0)
+    monkeypatch.setattr(history_store, "_series_meta", {})
+    return fake
+
+def test_appends_new_bars_incrementally(upstream):
+    today = pd.Timestamp.now(tz="UTC").normalize().tz_localize(None)
+    closes = 100 + np.arange(80.0)
+    upstream.frame = daily_bars(closes, today).iloc[:-1]
+    history_store.load_history("TEST", "3mo")
+
+    upstream.frame = daily_bars(closes, today)
+    hist = history_store.load_history("TEST", "3mo")
+
+    # The second fetch only asked for the tail, starting at an already stored bar
+    assert upstream.starts[-1] == upstream.frame.index[-3].strftime("%Y-%m-%d")
+    np.testing.assert_array_equal(hist["Close"].to_numpy(), upstream.frame["Close"].to_numpy()[-len(hist):])
+
+def test_split_rebuilds_the_stored_window(upstream):
+    today = pd.Timestamp.now(tz="UTC").normalize().tz_localize(None)
+    closes = 200 + np.arange(80.0)
+    upstream.frame = daily_bars(closes, today).iloc[:-1]
+    history_store.load_history("TEST", "3mo")
+
+    # 2:1 split: yfinance halves every earlier close and serves the new bar on that basis
+    adjusted = closes / 2
+    upstream.frame = daily_bars(adjusted, today)
+    hist = history_store.load_history("TEST", "3mo")
+
+    # The whole window was re-downloaded, so the series has no step at the split
+    assert upstream.starts[-1] == upstream.starts[0]
+    np.testing.assert_allclose(hist["Close"].to_numpy(), adjusted[-len(hist):])
+    assert np.abs(np.diff(hist["Close"].to_numpy())).max() == pytest.approx(0.5)
+
+def test_matching_bases_do_not_trigger_a_full_download(upstream):
+    today = pd.Timestamp.now(tz="UTC").normalize().tz_localize(None)
+    closes = 50 + np.arange(80.0)
+    upstream.frame = daily_bars(closes, today)
+    history_store.load_history("TEST", "3mo")
+
+    # A partial last bar that moved is not a re-adjustment
+    closes[-1] += 3
+    upstream.frame = daily_bars(closes, today)
+    hist = history_store.load_history("TEST", "3mo")
+
+    assert len(upstream.starts) == 2 and upstream.starts[1] != upstream.starts[0]
+    assert hist["Close"].iloc[-1] == closes[-1]
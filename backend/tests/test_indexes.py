@@ -0,0 +1,61 @@
+import os
+import pytest
+from bson import ObjectId
+from database.indexes import INDEXES, hot_queries, check_query_plans, ensure_indexes, RequiredIndexError
+
+def query_fields(query):
+    fields = set()
+    for key, value in query.items():
+        if key == "$or":
+            for clause in value:
+                fields |= query_fields(clause)
+        else:
+            fields.add(key)
+    return fields
+
+@pytest.mark.parametrize("label, collection, query, sort", hot_queries(), ids=lambda value: value if isinstance(value, str) else "")
+def test_hot_query_has_an_index(label, collection, query, sort):
+    # An index can only serve the query if it leads with a field the query filters on
+    leading_fields = {next(iter(model.document["key"])) for model in INDEXES[collection]}
+    assert leading_fields & query_fields(query), f"{label}: no index leads with one of {sorted(query_fields(query))}"
+
+@pytest.mark.skipif(not os.environ.get("MONGO_TEST_URI"), reason="MONGO_TEST_URI is not set")
+def test_hot_query_plans_use_indexes():
+    # explain() needs a real server: point MONGO_TEST_URI at a disposable MongoDB
+    from pymongo import MongoClient
+    client = MongoClient(os.environ["MONGO_TEST_URI"], serverSelectionTimeoutMS=5000)
+    db = client[f"test_query_plans_{ObjectId()}"]
+    try:
+        assert ensure_indexes(db) == []
+        assert check_query_plans(db)
+    finally:
+        client.drop_database(db.name)
+        client.close()
+
+def test_dedupe_clears_the_way_for_unique_indexes():
+    mongomock = pytest.importorskip("mongomock")
+    from database.dedupe import dedupe
+
+    db = mongomock.MongoClient().db
+    user_id, other_id = ObjectId(), ObjectId()
+    db.users.insert_many([{"_id": user_id, "email": "a@example.com", "username": "a"},
+                          {"_id": other_id, "email": "a@example.com", "username": "b"}])
+    db.portfolio.insert_many([
+        {"user_id": user_id, "symbol": "AAPL", "quantity": 1, "total_investment": 100.0, "average_price": 100.0},
+        {"user_id": user_id, "symbol": "AAPL", "quantity": 3, "total_investment": 600.0, "average_price": 200.0},
+    ])
+    db.watchlist.insert_many([{"user_id": str(user_id), "stocks": [{"symbol": "A"}, {"symbol": "B"}]},
+                              {"user_id": str(user_id), "stocks": [{"symbol": "B"}, {"symbol": "C"}]}])
+
+    with pytest.raises(RequiredIndexError):
+        ensure_indexes(db)
+
+    assert dedupe(db, apply=True)["portfolio.user_symbol_unique"] == 1
+    assert set(dedupe(db).values()) == {0}
+    ensure_indexes(db)
+
+    holding = db.portfolio.find_one({"user_id": user_id, "symbol": "AAPL"})
+    assert (holding["quantity"], holding["total_investment"], holding["average_price"]) == (4, 700.0, 175.0)
+    assert [stock["symbol"] for stock in db.watchlist.find_one({"user_id": str(user_id)})["stocks"]] == ["A", "B", "C"]
+    assert db.users.find_one({"_id": user_id})["email"] == "a@example.com"
+    assert db.users.find_one({"_id": other_id})["email"] == f"a@example.com+duplicate-{other_id}"
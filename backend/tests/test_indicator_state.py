@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from services import indicators
+from services.indicator_state import IndicatorState
+
+# Streaming results must match the batch kernels to within float noise
+TOLERANCE = dict(rel=1e-9, abs=1e-9)
+
+def random_walk(bars, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.standard_normal(bars))
+
+def batch_values(closes):
+    """Last-bar values of every indicator IndicatorState tracks, from services.indicators"""
+    macd, signal, _ = indicators.macd(closes)
+    return {
+        "ma20": indicators.sma(closes, 20)[-1],
+        "ma50": indicators.sma(closes, 50)[-1],
+        "rsi": indicators.rsi(closes, 14)[-1],
+        "macd": macd[-1],
+        "macd_signal": signal[-1],
+    }
+
+def streaming_values(snapshot):
+    return {
+        "ma20": snapshot["moving_averages"][20],
+        "ma50": snapshot["moving_averages"][50],
+        "rsi": snapshot["rsi"],
+        "macd": snapshot["macd"],
+        "macd_signal": snapshot["macd_signal"],
+    }
+
+def assert_matches_batch(snapshot, closes):
+    expected = batch_values(closes)
+    actual = streaming_values(snapshot)
+    for name, value in expected.items():
+        if np.isnan(value):
+            assert actual[name] is None, name
+        else:
+            assert actual[name] == pytest.approx(value, **TOLERANCE), name
+
+def test_matches_batch_at_every_bar():
+    closes = random_walk(200)
+    state = IndicatorState()
+    for t, close in enumerate(closes):
+        state.update(t, close)
+        assert_matches_batch(state.snapshot(), closes[:t + 1])
+
+def test_update_many_matches_batch():
+    closes = random_walk(300, seed=1)
+    state = IndicatorState()
+    state.update_many(np.arange(len(closes)), closes)
+    snapshot = state.snapshot()
+    assert_matches_batch(snapshot, closes)
+    assert snapshot["bars"] == len(closes)
+    assert snapshot["price"] == closes[-1]
+    assert snapshot["previous_close"] == closes[-2]
+    assert snapshot["week_ago_close"] == closes[-5]
+
+def test_values_are_none_until_enough_bars():
+    state = IndicatorState()
+    state.update_many(np.arange(15), random_walk(15, seed=2))
+    snapshot = state.snapshot()
+    assert snapshot["moving_averages"] == {20: None, 50: None}
+    assert snapshot["rsi"] is not None
+    assert snapshot["macd"] is None and snapshot["macd_signal"] is None
+
+def test_same_timestamp_replaces_last_bar():
+    closes = random_walk(120, seed=3)
+    state = IndicatorState()
+    state.update_many(np.arange(len(closes)), closes)
+
+    # The latest bar is revised twice intraday
+    for revised in (closes[-1] + 2.5, closes[-1] - 1.0):
+        state.update(len(closes) - 1, revised)
+        expected = np.append(closes[:-1], revised)
+        snapshot = state.snapshot()
+        assert_matches_batch(snapshot, expected)
+        assert snapshot["bars"] == len(closes)
+        assert snapshot["price"] == revised
+
+    # A new bar after the revision continues from the revised series
+    state.update(len(closes), 101.0)
+    assert_matches_batch(state.snapshot(), np.append(expected, 101.0))
+
+def test_older_timestamp_is_ignored():
+    closes = random_walk(80, seed=4)
+    state = IndicatorState()
+    state.update_many(np.arange(len(closes)), closes)
+    before = state.snapshot()
+    state.update(10, 500.0)
+    assert state.snapshot() == before
+
+def test_preview_does_not_commit():
+    closes = random_walk(150, seed=5)
+    state = IndicatorState()
+    state.update_many(np.arange(len(closes)), closes)
+    before = state.snapshot()
+
+    preview = state.preview(closes[-1] * 1.03)
+    assert_matches_batch(preview, np.append(closes, closes[-1] * 1.03))
+    assert preview["bars"] == len(closes) + 1
+
+    assert state.snapshot() == before
+    # The real next bar is unaffected by the preview
+    state.update(len(closes), 99.0)
+    assert_matches_batch(state.snapshot(), np.append(closes, 99.0))
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+class TTLCache:
+    """Bounded in-memory LRU cache with monotonic-clock TTLs.
+
+    Entries are fresh for `ttl` seconds and then stale for a further
+    `stale_ttl` seconds, during which lookup() still returns them so callers
+    can serve the old value while they refresh it. Once `max_entries` is
+    reached the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60, stale_ttl=0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def lookup(self, key):
+        """Return (value, state) where state is FRESH, STALE or MISS"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, MISS
+
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value, FRESH
+            if now < stale_until:
+                self._data.move_to_end(key)
+                self.stale_hits += 1
+                return value, STALE
+
+            del self._data[key]
+            self.misses += 1
+            return None, MISS
+
+    def peek(self, key):
+        """lookup() without touching hit counters or LRU order"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None, MISS
+            value, fresh_until, stale_until = entry
+            if now < fresh_until:
+                return value, FRESH
+            if now < stale_until:
+                return value, STALE
+            return None, MISS
+
+    def get(self, key, default=None):
+        """Return the value only while it is fresh"""
+        value, state = self.lookup(key)
+        return value if state == FRESH else default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        fresh_until = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, fresh_until, fresh_until + self.stale_ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+            }
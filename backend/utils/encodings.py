@@ -0,0 +1,27 @@
+from flask import jsonify, request, current_app
+
+try:
+    import msgpack
+except ImportError:  # binary responses are only offered when msgpack is installed
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+
+def offered_mimetypes():
+    return (JSON_MIMETYPE,) + (MSGPACK_MIMETYPES if msgpack is not None else ())
+
+def negotiated_response(payload):
+    """jsonify(payload), or MessagePack when the Accept header prefers it.
+
+    JSON stays the default for */*, a missing header or anything not offered.
+    The payload must already be plain lists/dicts/str/numbers (as built by
+    the stock service); MessagePack keeps floats as binary doubles.
+    """
+    mimetype = request.accept_mimetypes.best_match(offered_mimetypes()) or JSON_MIMETYPE
+    if mimetype == JSON_MIMETYPE:
+        response = jsonify(payload)
+    else:
+        response = current_app.response_class(msgpack.packb(payload, use_bin_type=True), mimetype=mimetype)
+    response.vary.add("Accept")
+    return response
@@ -0,0 +1,55 @@
+from datetime import date, datetime, timezone
+import numpy as np
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder with the same conversions
+    orjson = None
+
+def _default(obj):
+    """Types the encoder doesn't know natively: ObjectId, datetimes, NumPy values"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        # Mongo and utcnow() datetimes are naive UTC; say so, or browsers read them as local time
+        return (obj if obj.tzinfo else obj.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return DefaultJSONProvider.default(obj)
+
+class MongoJSONProvider(DefaultJSONProvider):
+    """app.json provider that encodes documents and NumPy results as they are.
+
+    With orjson installed, responses are encoded straight to bytes by orjson
+    (ObjectId/date handled by _default, NumPy arrays and scalars natively);
+    otherwise the stdlib encoder is used with the same _default.
+    """
+
+    default = staticmethod(_default)
+
+    if orjson is not None:
+        def _options(self, indent=False):
+            option = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return option
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, default=_default, option=self._options(kwargs.get("indent"))).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            indent = (self.compact is None and self._app.debug) or self.compact is False
+            body = orjson.dumps(obj, default=_default, option=self._options(indent))
+            return self._app.response_class(body + b"\n", mimetype=self.mimetype)
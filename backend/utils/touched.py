@@ -0,0 +1,29 @@
+import threading
+
+class TouchedKeys:
+    """Thread-safe set of keys written since it was last drained.
+
+    Lets a periodic repair job look only at what changed (e.g. users whose
+    counters were just moved) instead of scanning a whole collection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = set()
+
+    def add(self, key):
+        with self._lock:
+            self._keys.add(key)
+
+    def update(self, keys):
+        with self._lock:
+            self._keys.update(keys)
+
+    def drain(self):
+        """Return every key added so far and start over with an empty set"""
+        with self._lock:
+            keys, self._keys = self._keys, set()
+        return list(keys)
+
+    def __len__(self):
+        return len(self._keys)
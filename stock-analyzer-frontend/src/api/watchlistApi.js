@@ -8,8 +8,8 @@ export const watchlistAPI = {
 };
 
 export const notificationAPI = {
-  getNotifications: (unreadOnly = false) => 
-    API.get(`/notifications?unread_only=${unreadOnly}`),
+  getNotifications: (unreadOnly = false, cursor = null) => 
+    API.get('/notifications', { params: { unread_only: unreadOnly, ...(cursor && { cursor }) } }),
   markAsRead: (notificationId) => 
     API.put(`/notifications/${notificationId}/read`),
   getUnreadCount: () => API.get('/notifications/unread/count'),
@@ -1,74 +1,51 @@
-import React, { useEffect, useRef } from 'react';
-import { stockAPI } from '../api/stockApi';
+import { useEffect, useRef } from 'react';
+import socket from '../utils/socket';
 
-const RealTimeUpdater = ({ stocks, onStockUpdate, interval = 30000 }) => {
-  const intervalRef = useRef(null);
-  const isMounted = useRef(true);
-  const previousStocksRef = useRef([]);
+// Subscribes to server-pushed prices for the real-time stocks on screen. The
+// backend fetches each subscribed symbol once and broadcasts it to a
+// per-symbol room, so no per-symbol HTTP polling happens here.
+const RealTimeUpdater = ({ stocks, onStockUpdate }) => {
+  const onStockUpdateRef = useRef(onStockUpdate);
+  const pricesRef = useRef({});
 
   useEffect(() => {
-    isMounted.current = true;
-    
-    const updatePrices = async () => {
-      if (!isMounted.current) return;
-      
-      try {
-        // Update only stocks that are real-time and actually changed
-        const realTimeStocks = stocks.filter(stock => 
-          stock.is_real_time && !stock.is_loading
-        );
-        
-        // Skip if no real-time stocks or stocks haven't changed
-        if (realTimeStocks.length === 0) return;
-        
-        for (const stock of realTimeStocks) {
-          if (!isMounted.current) break;
-          
-          try {
-            const response = await stockAPI.getStock(stock.symbol);
-            if (isMounted.current && response.data.success) {
-              const newPrice = response.data.data.price;
-              // Only update if price actually changed
-              if (newPrice !== stock.price) {
-                onStockUpdate(stock.symbol, newPrice);
-              }
-            }
-          } catch (error) {
-            console.error(`Error updating ${stock.symbol}:`, error);
-          }
-          
-          // Small delay between requests to avoid rate limiting
-          if (isMounted.current) {
-            await new Promise(resolve => setTimeout(resolve, 500));
-          }
-        }
-      } catch (error) {
-        console.error('Error in real-time update:', error);
-      }
-    };
+    onStockUpdateRef.current = onStockUpdate;
+    pricesRef.current = Object.fromEntries(stocks.map(stock => [stock.symbol, stock.price]));
+  }, [stocks, onStockUpdate]);
+
+  // Only resubscribe when the set of real-time symbols changes, not on every price tick
+  const symbolsKey = stocks
+    .filter(stock => stock.is_real_time && !stock.is_loading)
+    .map(stock => stock.symbol.toUpperCase())
+    .sort()
+    .join(',');
+
+  useEffect(() => {
+    if (!symbolsKey) return undefined;
+    const symbols = symbolsKey.split(',');
+
+    const subscribe = () => socket.emit('subscribe', { symbols });
 
-    // Initial update after a delay
-    const initialTimer = setTimeout(() => {
-      if (isMounted.current) {
-        updatePrices();
+    const handlePriceUpdate = (quote) => {
+      if (!quote || !symbols.includes(quote.symbol)) return;
+      // Only update if price actually changed
+      if (quote.price !== pricesRef.current[quote.symbol]) {
+        onStockUpdateRef.current(quote.symbol, quote.price);
       }
-    }, 5000);
+    };
 
-    // Set up interval for updates only if we have real-time stocks
-    if (stocks.some(stock => stock.is_real_time)) {
-      intervalRef.current = setInterval(updatePrices, interval);
-    }
+    socket.on('price_update', handlePriceUpdate);
+    socket.on('connect', subscribe); // rooms are lost on reconnect
+    if (socket.connected) subscribe();
 
     return () => {
-      isMounted.current = false;
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current);
-      }
-      clearTimeout(initialTimer);
+      socket.off('price_update', handlePriceUpdate);
+      socket.off('connect', subscribe);
+      if (socket.connected) socket.emit('unsubscribe', { symbols });
     };
-  }, [stocks, onStockUpdate, interval]); // Proper dependencies
+  }, [symbolsKey]);
 
   return null; // This component doesn't render anything
 };
 
-export default RealTimeUpdater;
\ No newline at end of file
+export default RealTimeUpdater;
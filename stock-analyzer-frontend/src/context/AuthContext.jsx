@@ -1,5 +1,6 @@
 import React, { createContext, useState, useEffect } from 'react';
 import { authAPI } from '../api/watchlistApi';
+import { reconnectSocket } from '../utils/socket';
 
 export const AuthContext = createContext();
 
@@ -34,6 +35,7 @@ export const AuthProvider = ({ children }) => {
         
         localStorage.setItem('user', JSON.stringify(userData));
         setUser(userData);
+        reconnectSocket();
         
         console.log('✅ Login successful');
         return response.data;
@@ -66,6 +68,7 @@ export const AuthProvider = ({ children }) => {
   const logout = () => {
     localStorage.removeItem('user');
     setUser(null);
+    reconnectSocket();
   };
 
   const updateProfile = async (profileData) => {
@@ -17,6 +17,7 @@ export const NotificationProvider = ({ children }) => {
   const [notifications, setNotifications] = useState([]);
   const [unreadCount, setUnreadCount] = useState(0);
   const [loading, setLoading] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isConnected, setIsConnected] = useState(false);
 
   // WebSocket connection status
@@ -104,6 +105,7 @@ export const NotificationProvider = ({ children }) => {
       const response = await notificationAPI.getNotifications(unreadOnly);
       if (response.data.success) {
         setNotifications(response.data.data);
+        setNextCursor(response.data.next_cursor || null);
       }
     } catch (error) {
       console.error('Error fetching notifications:', error);
@@ -115,6 +117,23 @@ export const NotificationProvider = ({ children }) => {
     }
   };
 
+  // Append the next page of older notifications (keyset cursor from the last page)
+  const loadMoreNotifications = async (unreadOnly = false) => {
+    if (!nextCursor) return;
+    try {
+      setLoading(true);
+      const response = await notificationAPI.getNotifications(unreadOnly, nextCursor);
+      if (response.data.success) {
+        setNotifications(prev => [...prev, ...response.data.data]);
+        setNextCursor(response.data.next_cursor || null);
+      }
+    } catch (error) {
+      console.error('Error loading more notifications:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const fetchUnreadCount = async () => {
     try {
       const response = await notificationAPI.getUnreadCount();
@@ -185,7 +204,9 @@ export const NotificationProvider = ({ children }) => {
     unreadCount,
     loading,
     isConnected, // WebSocket connection status
+    hasMore: Boolean(nextCursor),
     fetchNotifications,
+    loadMoreNotifications,
     fetchUnreadCount,
     markAsRead,
     markAllAsRead,
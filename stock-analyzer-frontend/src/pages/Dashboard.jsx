@@ -171,7 +171,6 @@ const Dashboard = () => {
         <RealTimeUpdater 
           stocks={stocks} 
           onStockUpdate={updateStockPrice}
-          interval={30000} // 30 seconds
         />
       )}
 
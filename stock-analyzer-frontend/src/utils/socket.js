@@ -1,9 +1,21 @@
 import io from 'socket.io-client';
 
+// Token of the logged-in user, sent on every (re)connect. The server only
+// accepts authenticated sockets and joins them to the user's room for price alerts
+const getAuthToken = () => {
+  try {
+    const raw = localStorage.getItem('user');
+    return raw ? JSON.parse(raw)?.access_token : null;
+  } catch (error) {
+    return null;
+  }
+};
+
 // Create Socket.IO connection
 const socket = io(process.env.REACT_APP_WS_URL || 'http://localhost:5000', {
+  auth: (cb) => cb({ token: getAuthToken() }),
   transports: ['websocket', 'polling'],
-  autoConnect: true,
+  autoConnect: Boolean(getAuthToken()),
   reconnection: true,
   reconnectionAttempts: 5,
   reconnectionDelay: 1000,
@@ -22,4 +34,11 @@ socket.on('connect_error', (error) => {
   console.error('❌ WebSocket connection error:', error);
 });
 
+// Reconnect so the handshake picks up a changed login state (stay
+// disconnected after logout)
+export const reconnectSocket = () => {
+  socket.disconnect();
+  if (getAuthToken()) socket.connect();
+};
+
 export default socket;
\ No newline at end of file